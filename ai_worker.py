@@ -0,0 +1,135 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class BackgroundAI:
+    """
+    Runs an AI's searches on one background thread so a GUI main loop
+    keeps pumping events while the AI thinks.
+
+      * think(game) starts the search for the AI's move; poll() it once
+        per frame until it returns the column.
+      * ponder(game) speculatively searches a position the AI expects to
+        face (e.g. the game after the human's hovered move). If think() is
+        later called with that same position the running or finished ponder
+        search is adopted instead of starting over; otherwise it is stopped.
+      * analyse(game) scores every column of a position (see
+        MiniMaxAI.analyse) for hints; analysis(game) returns the latest
+        finished result for that position, or None. Analyses yield to
+        think(): a running one is stopped at its last completed depth.
+
+    Games are Connect4 objects with the AI as the current player; each
+    search gets its own copy.
+
+    Searches run one at a time on the same thread, so the AI's tables are
+    never touched by two searches at once.
+    """
+
+    def __init__(self, ai):
+        self.ai = ai
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ai')
+        # (game key, future, stop event) of the search the game waits for,
+        # and of the current speculative search
+        self._active = None
+        self._ponder = None
+        self._analyse = None
+        self._analysis = None # (game key, result) of the last finished analysis
+
+        self.ponder_hits = 0
+        self.ponder_misses = 0
+
+    @property
+    def thinking(self):
+        return self._active is not None
+
+    def _submit(self, game, search=None):
+        game = game.copy()
+        stop = threading.Event()
+        future = self._executor.submit(search or self.ai.find_best_move, game, stop_event=stop)
+        return game.key(), future, stop
+
+    def _stop(self, job):
+        if job is not None:
+            _, future, stop = job
+            future.cancel() # Still queued: never runs
+            stop.set()      # Running: aborts at its next budget check
+
+    def ponder(self, game):
+        if self._active is not None:
+            return # Never compete with the real search
+        if self._ponder is not None and self._ponder[0] == game.key():
+            return
+        self._stop(self._ponder)
+        self._ponder = self._submit(game)
+
+    def stop_pondering(self):
+        self._stop(self._ponder)
+        self._ponder = None
+
+    def analyse(self, game):
+        """
+        Starts analysing `game` unless that is already running. Calling it
+        again once it has finished refines the cached result further.
+        """
+        if self._analyse is not None and self._analyse[0] == game.key() and \
+           not self._analyse[1].done():
+            return
+        self._collect_analysis()
+        self._stop(self._analyse)
+        self._analyse = self._submit(game, self.ai.analyse)
+
+    def _collect_analysis(self):
+        if self._analyse is not None and self._analyse[1].done() and \
+           not self._analyse[1].cancelled():
+            self._analysis = (self._analyse[0], self._analyse[1].result())
+
+    def analysis(self, game):
+        """
+        The latest finished analysis of `game`, or None.
+        """
+        self._collect_analysis()
+        if self._analysis is not None and self._analysis[0] == game.key():
+            return self._analysis[1]
+        return None
+
+    def think(self, game):
+        self._stop(self._analyse) # Hints can wait, the move cannot
+        if self._ponder is not None and self._ponder[0] == game.key():
+            self._active = self._ponder
+            self.ponder_hits += 1
+        else:
+            if self._ponder is not None:
+                self.ponder_misses += 1
+            self._stop(self._ponder)
+            self._active = self._submit(game)
+        self._ponder = None
+
+    def poll(self):
+        """
+        Returns the AI's column once its search has finished, else None.
+        """
+        if self._active is None or not self._active[1].done():
+            return None
+        future = self._active[1]
+        self._active = None
+        return future.result()
+
+    def reset(self):
+        """
+        Drops any search in progress and resets the AI for a new game once
+        that search has unwound.
+        """
+        self._stop(self._active)
+        self._stop(self._ponder)
+        self._stop(self._analyse)
+        self._active = None
+        self._ponder = None
+        self._analyse = None
+        self._analysis = None
+        self._executor.submit(self.ai.reset)
+
+    def shutdown(self):
+        self._stop(self._active)
+        self._stop(self._ponder)
+        self._stop(self._analyse)
+        self._executor.shutdown(wait=True, cancel_futures=True)
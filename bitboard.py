@@ -0,0 +1,312 @@
+from functools import lru_cache
+
+EMPTY = '   '
+
+
+@lru_cache(maxsize=None)
+def window_masks(rows, cols, connect=4):
+    """
+    Returns a tuple with one bitmask per `connect`-cell window (horizontal,
+    vertical and both diagonals) for a board of the given shape.
+    Cached per shape so every Position of the same size shares it.
+    """
+    height = rows + 1
+    n = connect
+    masks = []
+
+    def bit(row, col):
+        return 1 << (col * height + row)
+
+    # Horizontal Windows
+    for row in range(rows):
+        for col in range(cols - n + 1):
+            masks.append(sum(bit(row, col + i) for i in range(n)))
+    # Vertical Windows
+    for col in range(cols):
+        for row in range(rows - n + 1):
+            masks.append(sum(bit(row + i, col) for i in range(n)))
+    # Diagonal (/) Windows
+    for col in range(cols - n + 1):
+        for row in range(rows - n + 1):
+            masks.append(sum(bit(row + i, col + i) for i in range(n)))
+    # Diagonal (\) Windows
+    for col in range(cols - n + 1):
+        for row in range(n - 1, rows):
+            masks.append(sum(bit(row - i, col + i) for i in range(n)))
+
+    return tuple(masks)
+
+
+@lru_cache(maxsize=None)
+def line_shifts(height, connect=4):
+    """
+    Shift sequences that test for `connect` in a row, one per direction
+    (vertical, horizontal and both diagonals): ANDing a mask with itself
+    shifted right by each step in turn leaves a bit set only where a line
+    starts. Run lengths double at every step, so four in a row takes two
+    shifts (1 then 2 cells) and five takes three (1, 2, then 1).
+    """
+    steps = []
+    length = 1
+    while 2 * length < connect:
+        steps.append(length)
+        length *= 2
+    steps.append(connect - length)
+    return tuple(tuple(step * shift for step in steps if step)
+                 for shift in (1, height, height - 1, height + 1))
+
+
+@lru_cache(maxsize=None)
+def shape_masks(rows, cols):
+    """
+    (bottom, board, columns) masks for a board of the given shape: the
+    bottom cell of every column, every playable cell, and one mask per
+    column. Cached per shape like window_masks.
+    """
+    height = rows + 1
+    bottom = sum(1 << (col * height) for col in range(cols))
+    board = bottom * ((1 << rows) - 1)
+    columns = tuple(((1 << rows) - 1) << (col * height) for col in range(cols))
+    return bottom, board, columns
+
+
+def has_line(pieces, lines):
+    # `lines` from line_shifts()
+    for shifts in lines:
+        run = pieces
+        for shift in shifts:
+            run &= run >> shift
+        if run:
+            return True
+    return False
+
+
+def winning_cells(pieces, mask, height, board, connect=4):
+    """
+    Empty cells (of `board`, the playable cells mask) that would complete
+    `connect` in a row for `pieces`; `mask` holds the occupied cells.
+    """
+    if connect == 4:
+        # Vertical
+        cells = (pieces << 1) & (pieces << 2) & (pieces << 3)
+        # Horizontal and both Diagonals
+        for shift in (height, height - 1, height + 1):
+            pair = (pieces << shift) & (pieces << 2 * shift)
+            cells |= pair & (pieces << 3 * shift)
+            cells |= pair & (pieces >> shift)
+            pair = (pieces >> shift) & (pieces >> 2 * shift)
+            cells |= pair & (pieces << shift)
+            cells |= pair & (pieces >> 3 * shift)
+        return cells & (board ^ mask)
+
+    # Any N: the empty cell can be at each place of the line
+    cells = 0
+    for shift in (1, height, height - 1, height + 1):
+        for gap in range(connect):
+            line = board
+            for place in range(connect):
+                offset = (place - gap) * shift
+                if offset > 0:
+                    line &= pieces >> offset
+                elif offset < 0:
+                    line &= pieces << -offset
+            cells |= line
+    return cells & (board ^ mask)
+
+
+def mirror_columns(bits, height, cols):
+    """
+    `bits` (a mask, or a key built column by column like Position.key())
+    reflected left to right: column c moves to cols - 1 - c.
+    """
+    column = (1 << height) - 1
+    mirrored = 0
+    for _ in range(cols):
+        mirrored = (mirrored << height) | (bits & column)
+        bits >>= height
+    return mirrored
+
+
+@lru_cache(maxsize=None)
+def center_order(cols):
+    """
+    Columns sorted center-out (center first, then alternating outwards),
+    the usual static move order for Connect 4.
+    """
+    return tuple(sorted(range(cols), key=lambda col: abs(2 * col - (cols - 1))))
+
+
+class Position:
+    """
+    Connect 4 position stored as two integer bitboards (one per side) and
+    per-column heights.
+
+    Bit layout is column major with one spare sentinel bit on top of every
+    column, so cell (row, col) lives at bit col * (rows + 1) + row, where
+    row 0 is the BOTTOM of the board. The sentinel row keeps the shift based
+    N-in-a-row test from wrapping from one column into the next.
+    Any board size works (the masks are Python ints); `connect` is the
+    number in a row that wins.
+
+    Sides are 0 and 1. `to_move` is the side that plays the next move.
+    """
+
+    __slots__ = ('rows', 'cols', 'connect', 'height', 'lines', 'masks', 'heights',
+                 'moves', 'to_move')
+
+    def __init__(self, rows=6, cols=7, connect=4):
+        self.rows = rows
+        self.cols = cols
+        self.connect = connect
+        self.height = rows + 1
+        self.lines = line_shifts(rows + 1, connect)
+        self.masks = [0, 0]
+        self.heights = [0] * cols
+        self.moves = 0
+        self.to_move = 0
+
+    @classmethod
+    def from_board(cls, board, to_move_piece, other_piece, connect=4):
+        """
+        Converts a Connect4 list-of-lists board (row 0 at the top) into a
+        Position where side 0 owns `to_move_piece` and is about to play.
+        """
+        rows = len(board)
+        cols = len(board[0])
+        position = cls(rows, cols, connect)
+
+        for col in range(cols):
+            for row in range(rows - 1, -1, -1):
+                cell = board[row][col]
+                if cell == EMPTY:
+                    break
+
+                bit = 1 << (col * position.height + position.heights[col])
+                if cell == to_move_piece:
+                    position.masks[0] |= bit
+                elif cell == other_piece:
+                    position.masks[1] |= bit
+                position.heights[col] += 1
+                position.moves += 1
+
+        return position
+
+    def copy(self):
+        other = Position.__new__(Position)
+        other.rows = self.rows
+        other.cols = self.cols
+        other.connect = self.connect
+        other.height = self.height
+        other.lines = self.lines
+        other.masks = self.masks[:]
+        other.heights = self.heights[:]
+        other.moves = self.moves
+        other.to_move = self.to_move
+        return other
+
+    def can_play(self, col):
+        return self.heights[col] < self.rows
+
+    def valid_moves(self):
+        return [col for col in range(self.cols) if self.heights[col] < self.rows]
+
+    def make_move(self, col):
+        """
+        Drops a piece for the side to move into `col` and passes the turn.
+        The caller is responsible for checking `can_play` first.
+        """
+        self.masks[self.to_move] |= 1 << (col * self.height + self.heights[col])
+        self.heights[col] += 1
+        self.moves += 1
+        self.to_move ^= 1
+
+    def unmake_move(self, col):
+        """
+        Takes back the last piece dropped into `col`.
+        """
+        self.to_move ^= 1
+        self.moves -= 1
+        self.heights[col] -= 1
+        self.masks[self.to_move] ^= 1 << (col * self.height + self.heights[col])
+
+    def key(self):
+        """
+        Unique integer key of the position. Side 0's pieces plus the occupied
+        mask sets exactly one bit above the top of every column, so no two
+        positions share a key; the side to move is folded into bit 0.
+        """
+        return ((self.masks[0] + (self.masks[0] | self.masks[1])) << 1) | self.to_move
+
+    def mover_key(self):
+        """
+        Like key(), but built from the pieces of the side to move, so it does
+        not depend on which side is 0. Used by caches shared between games.
+        """
+        return self.masks[self.to_move] + (self.masks[0] | self.masks[1])
+
+    def mirror_mask(self, mask):
+        """
+        Returns `mask` reflected left to right (column c <-> cols - 1 - c).
+        """
+        return mirror_columns(mask, self.height, self.cols)
+
+    def mirror_key(self):
+        """
+        key() of the position's left-right mirror; equal to key() exactly
+        when the position is symmetric. Pieces plus occupied cells never
+        carry from one column into the next, so the key mirrors as a whole.
+        """
+        code = self.masks[0] + (self.masks[0] | self.masks[1])
+        return (mirror_columns(code, self.height, self.cols) << 1) | self.to_move
+
+    def canonical_mover_key(self):
+        """
+        Returns (key, mirrored): the smaller of mover_key() for the position
+        and for its left-right mirror, and whether the mirror was picked.
+        """
+        mover = self.masks[self.to_move]
+        occupied = self.masks[0] | self.masks[1]
+        key = mover + occupied
+        mirror_key = self.mirror_mask(mover) + self.mirror_mask(occupied)
+        if mirror_key < key:
+            return mirror_key, True
+        return key, False
+
+    def is_winning_move(self, col, side=None):
+        """
+        True if dropping a piece of `side` (default: the side to move) into
+        `col` would complete a line. Does NOT modify the position.
+        """
+        if side is None:
+            side = self.to_move
+        mask = self.masks[side] | (1 << (col * self.height + self.heights[col]))
+        if self.connect != 4:
+            return has_line(mask, self.lines)
+        h = self.height # Unrolled for the standard game, the hot case
+        for shift in (1, h, h - 1, h + 1):
+            pairs = mask & (mask >> shift)
+            if pairs & (pairs >> (2 * shift)):
+                return True
+        return False
+
+    def is_winner(self, side):
+        mask = self.masks[side]
+        if self.connect != 4:
+            return has_line(mask, self.lines)
+        h = self.height
+        # Vertical, Horizontal and both Diagonals
+        for shift in (1, h, h - 1, h + 1):
+            pairs = mask & (mask >> shift)
+            if pairs & (pairs >> (2 * shift)):
+                return True
+        return False
+
+    def last_move_won(self):
+        """
+        True if the side that just moved completed a line. This is the
+        only terminal check the search needs after each make_move.
+        """
+        return self.moves > 0 and self.is_winner(self.to_move ^ 1)
+
+    def is_full(self):
+        return self.moves == self.rows * self.cols
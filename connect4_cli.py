@@ -1,15 +1,96 @@
-import numpy as np
+import atexit
+from time import perf_counter
+
+from bitboard import Position
+from engines import ENGINES, create_ai
+
+AI_ENGINE = 'minimax' # 'minimax' or 'mcts'
+SHOW_AI_STATS = False # Print a summary of every AI search
+RECORD_GAMES = None   # Path of a game record file to append finished games to
+_record_writer = None # Opened on the first recorded game, kept for the session
+
+
+def print_search_stats(event, ai, stats):
+    if event == 'end':
+        print(f"AI {stats.summary()}")
+
+
+def record_writer():
+    # Opening a GameRecordWriter reads the whole file, so it is done once
+    global _record_writer
+    if _record_writer is None or _record_writer.path != RECORD_GAMES:
+        from game_records import GameRecordWriter
+        if _record_writer is not None:
+            _record_writer.close()
+        _record_writer = GameRecordWriter(RECORD_GAMES)
+        atexit.register(_record_writer.close)
+    return _record_writer
+
+
+# Player ids, as stored in Connect4.cells
+EMPTY = 0
+P1 = 1 # Red, moves first
+P2 = 2 # Blue
+
+# Only used to display the board
+PIECES = {EMPTY: '   ', P1: '\033[31m o \033[0m', P2: '\033[34m o \033[0m'}
 
-from minimax_ai import MiniMaxAI
 
 class Connect4:
-    def __init__(self, rows=6, cols=7):
+    # No per-game __dict__: a game is a few small objects, so one process
+    # can hold thousands of them
+    __slots__ = ('rows', 'cols', 'connect', 'cells', 'heights', 'current_player',
+                 'game_over', 'moves', 'last_move', 'history')
+
+    def __init__(self, rows=6, cols=7, connect=4):
         self.rows = rows
         self.cols = cols
-        self.board = [['   ' for _ in range(self.cols)] for _ in range(self.rows)]
-        self.current_player = '\033[31m o \033[0m' # Red 'o'
+        self.connect = connect # Pieces in a row needed to win
+        # One player id per cell, row by row with row 0 at the top, and the
+        # number of pieces in each column
+        self.cells = bytearray(rows * cols)
+        self.heights = bytearray(cols)
+        self.current_player = P1 # Red 'o'
         self.game_over = False
-
+        self.moves = 0          # Pieces on the board
+        self.last_move = None   # (row, col) of the last dropped piece
+        self.history = bytearray() # Columns played, in order
+
+    def copy(self):
+        game = Connect4.__new__(Connect4)
+        game.rows = self.rows
+        game.cols = self.cols
+        game.connect = self.connect
+        game.cells = self.cells[:]
+        game.heights = self.heights[:]
+        game.current_player = self.current_player
+        game.game_over = self.game_over
+        game.moves = self.moves
+        game.last_move = self.last_move
+        game.history = self.history[:]
+        return game
+
+    def get_piece(self, row, col):
+        return self.cells[row * self.cols + col]
+
+    def key(self):
+        # Hashable snapshot of the position
+        return bytes(self.cells), self.current_player
+
+    def to_position(self):
+        """
+        Returns the bitboard Position of this game, with the current player
+        as side 0 (to move).
+        """
+        position = Position(self.rows, self.cols, self.connect)
+        for col in range(self.cols):
+            for filled in range(self.heights[col]):
+                piece = self.cells[(self.rows - 1 - filled) * self.cols + col]
+                side = 0 if piece == self.current_player else 1
+                position.masks[side] |= 1 << (col * position.height + filled)
+            position.heights[col] = self.heights[col]
+        position.moves = self.moves
+        return position
 
     def print_board(self):
         cell = "---+"
@@ -19,8 +100,9 @@ class Connect4:
         #print board
         print(horizontal_line )
 
-        for row in self.board:
-            print('|' + '|'.join(row) + '|')
+        for row in range(self.rows):
+            cells = self.cells[row * self.cols:(row + 1) * self.cols]
+            print('|' + '|'.join(PIECES[piece] for piece in cells) + '|')
 
         print(horizontal_line )
         print("  " + col_num_string + "  ")
@@ -30,79 +112,60 @@ class Connect4:
         Returns the next open row in the given column, or None if the column is full.
         Does NOT modify the board.
         """
-        if col not in range(self.cols) or self.board[0][col] != '   ':
+        if col not in range(self.cols) or self.heights[col] == self.rows:
             return None
-        
-        for row in range(self.rows-1, -1, -1):
-            if self.board[row][col] == '   ':
-                return row
+        return self.rows - 1 - self.heights[col]
 
 
     def drop_piece(self, col):
         # Verify move
-        if col not in range(self.cols) or self.board[0][col] != '   ':
+        row = self.get_next_open_row(col)
+        if row is None:
             # Print error
             print("Invalid move!!")
             return False, None
-        
+
         # Drop piece to lowest row
-        for row in range(self.rows-1, -1, -1):
-            if self.board[row][col] == '   ':
-                self.board[row][col] = self.current_player
-                return True, row
-            
-        return False, None
+        self.cells[row * self.cols + col] = self.current_player
+        self.heights[col] += 1
+        self.moves += 1
+        self.last_move = (row, col)
+        self.history.append(col)
+        return True, row
     
-    def check_win(self):
-
-        # Horizontal Win Condition
-        for row in range(self.rows):
-            for col in range(self.cols - 3): # -3: as u only need to check 4 consec. cols
-                if self.board[row][col]   == self.current_player and \
-                   self.board[row][col+1] == self.current_player and \
-                   self.board[row][col+2] == self.current_player and \
-                   self.board[row][col+3] == self.current_player:
-                    return True
-        
-        # Vertical Win Condition
-        for col in range(self.cols):
-            for row in range(self.rows - 3): # -3: as u only need to check 4 consec. cols
-                if self.board[row][col]   == self.current_player and \
-                   self.board[row+1][col] == self.current_player and \
-                   self.board[row+2][col] == self.current_player and \
-                   self.board[row+3][col] == self.current_player:
-                    return True        
-
-        # Diagonal (/) Win Condition
-        for col in range(self.cols - 3): 
-            for row in range(self.rows-1, self.rows-4, -1):
-                if self.board[row][col]   == self.current_player and \
-                   self.board[row-1][col+1] == self.current_player and \
-                   self.board[row-2][col+2] == self.current_player and \
-                   self.board[row-3][col+3] == self.current_player:
-                    return True            
-
-        # Diagonal (\) Win Condition
-        for col in range(self.cols - 3): 
-            for row in range(self.rows - 3):
-                if self.board[row][col]   == self.current_player and \
-                   self.board[row+1][col+1] == self.current_player and \
-                   self.board[row+2][col+2] == self.current_player and \
-                   self.board[row+3][col+3] == self.current_player:
-                    return True            
+    def check_win(self, row=None, col=None):
+        """
+        Returns True if the piece at (row, col) completes `connect` in a row
+        for the current player. Only the four lines through that cell are
+        inspected; it defaults to the last piece dropped.
+        """
+        if row is None or col is None:
+            if self.last_move is None:
+                return False
+            row, col = self.last_move
+
+        # Horizontal, Vertical, Diagonal (\) and Diagonal (/)
+        for d_row, d_col in ((0, 1), (1, 0), (1, 1), (1, -1)):
+            count = 1 + self._count_in_direction(row, col,  d_row,  d_col) \
+                      + self._count_in_direction(row, col, -d_row, -d_col)
+            if count >= self.connect:
+                return True
         return False
+
+    def _count_in_direction(self, row, col, d_row, d_col):
+        # Consecutive current player pieces next to (row, col), up to connect - 1
+        count = 0
+        row, col = row + d_row, col + d_col
+        while count < self.connect - 1 and 0 <= row < self.rows and 0 <= col < self.cols and \
+              self.cells[row * self.cols + col] == self.current_player:
+            count += 1
+            row, col = row + d_row, col + d_col
+        return count
     
     def check_draw(self):
-        for r in range(self.rows):
-           for c in range(self.cols):
-               if self.board[r][c] == '   ':
-                   return False
-        return True
+        return self.moves == self.rows * self.cols
     
     def switch_player(self):
-        P1 = '\033[31m o \033[0m' # Red o
-        P2 = '\033[34m o \033[0m' # Blue o
-
         if self.current_player == P1:
             self.current_player = P2
         
@@ -118,20 +181,24 @@ class Connect4:
         ai_player = None
         if game_mode == '2':
             # AI will be Player 2, the blue piece
-            ai_player = MiniMaxAI(player_piece='\033[34m o \033[0m', level=4)
+            ai_player = create_ai(PIECES[P2], AI_ENGINE, 'hard')
+            if SHOW_AI_STATS:
+                ai_player.add_hook(print_search_stats)
             print("You are Player 1 \033[31m o \033[0m. The AI is Player 2 \033[34m o \033[0m.")
 
         # --- Start Game ---
         self.print_board()
+        think_ms = {P1: 0.0, P2: 0.0}
+        turn_started = perf_counter()
 
         while not self.game_over:
 
-            if ai_player is not None and self.current_player == '\033[34m o \033[0m':
-                chosen_col = ai_player.find_best_move(self.board)
+            if ai_player is not None and self.current_player == P2:
+                chosen_col = ai_player.find_best_move(self)
 
             else:
                 try:
-                    input_col = input(f"{self.current_player}'s move, , enter column (0-{self.cols-1}): ")
+                    input_col = input(f"{PIECES[self.current_player]}'s move, , enter column (0-{self.cols-1}): ")
                     chosen_col = int(input_col)
 
 
@@ -141,14 +208,17 @@ class Connect4:
 
 
             # 3. Attempt to execute move
-            is_valid_move = self.drop_piece(chosen_col)
+            is_valid_move, row = self.drop_piece(chosen_col)
 
             # 3A. If move is valid: check win/draw then switch player
             if is_valid_move:
+                now = perf_counter()
+                think_ms[self.current_player] += (now - turn_started) * 1000
+                turn_started = now
                 self.print_board() # Display updated board after move
 
-                if self.check_win():
-                    print(f"{self.current_player} wins! :)")
+                if self.check_win(row, chosen_col):
+                    print(f"{PIECES[self.current_player]} wins! :)")
                     self.game_over = True
                 
                 elif self.check_draw():
@@ -161,7 +231,22 @@ class Connect4:
             else:
                 continue
 
+        if RECORD_GAMES is not None:
+            from game_records import GameRecord, engine_info
+            engines = (engine_info(), engine_info(ai_player)) # AI (if any) is P2
+            record_writer().write(GameRecord.from_game(self, engines, (think_ms[P1], think_ms[P2])))
+
 
 if __name__ == "__main__":
-    game = Connect4()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Connect 4 in the terminal")
+    parser.add_argument('--engine', choices=ENGINES, default=AI_ENGINE, help="AI used in Player vs AI")
+    parser.add_argument('--rows', type=int, default=6)
+    parser.add_argument('--cols', type=int, default=7)
+    parser.add_argument('--connect', type=int, default=4, help="pieces in a row needed to win")
+    args = parser.parse_args()
+    AI_ENGINE = args.engine
+
+    game = Connect4(args.rows, args.cols, args.connect)
     game.play_game() 
@@ -0,0 +1,53 @@
+"""
+Headless Connect 4 engine: the game rules and the AIs, without Pygame.
+
+Names are imported from the project's modules on first use, so
+`import connect4_engine` costs almost nothing and NumPy is never loaded
+unless something asks for it (training data, NumpyEvaluator):
+
+    from connect4_engine import best_move
+    best_move("3343")['move']
+
+Run `python -m connect4_engine --help` for one-shot queries. The
+project root must be on sys.path (it is when run from there).
+"""
+import importlib
+
+# Public name -> module that defines it
+_EXPORTS = {
+    'EMPTY': 'connect4_cli',
+    'P1': 'connect4_cli',
+    'P2': 'connect4_cli',
+    'PIECES': 'connect4_cli',
+    'Connect4': 'connect4_cli',
+    'Position': 'bitboard',
+    'DIFFICULTIES': 'minimax_ai',
+    'MiniMaxAI': 'minimax_ai',
+    'MCTSAI': 'mcts_ai',
+    'ENGINES': 'engines',
+    'create_ai': 'engines',
+    'SearchStats': 'search_stats',
+    'GameRecord': 'game_records',
+    'GameRecordWriter': 'game_records',
+    'read_records': 'game_records',
+    'OpeningBook': 'opening_book',
+    'NumpyEvaluator': 'numpy_eval',
+    'parse_moves': 'connect4_engine.query',
+    'game_from_moves': 'connect4_engine.query',
+    'best_move': 'connect4_engine.query',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value # Later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return __all__
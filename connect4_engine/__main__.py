@@ -0,0 +1,88 @@
+from time import perf_counter
+
+_START = perf_counter() # Before anything of the engine is imported
+
+import argparse
+import json
+import subprocess
+import sys
+
+# Wall time allowed for a whole `python -m connect4_engine` run on the
+# --bench position: interpreter start, imports and the first move
+COLD_START_BUDGET_MS = 300
+BENCH_MOVES = '33'
+
+
+def run(args):
+    from connect4_engine.query import best_move
+    imported = perf_counter()
+    try:
+        result = best_move(args.moves, args.engine, args.difficulty, args.time_budget_ms,
+                           args.rows, args.cols, args.connect)
+    except ValueError as error:
+        print(json.dumps({'error': str(error)}))
+        return 2
+    result['import_ms'] = round((imported - _START) * 1000, 1)
+    result['total_ms'] = round((perf_counter() - _START) * 1000, 1)
+    print(json.dumps(result))
+    return 0
+
+
+def bench(args):
+    """
+    Times `args.bench` fresh interpreters answering one query, against
+    COLD_START_BUDGET_MS. Fails if the median run is over budget or the
+    query imported NumPy or Pygame.
+    """
+    command = [sys.executable, '-m', 'connect4_engine', args.moves or BENCH_MOVES,
+               '--engine', args.engine, '--difficulty', args.difficulty]
+    if args.time_budget_ms is not None:
+        command += ['--time-budget-ms', str(args.time_budget_ms)]
+    walls, reports = [], []
+    for _ in range(args.bench):
+        start = perf_counter()
+        output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+        walls.append((perf_counter() - start) * 1000)
+        reports.append(json.loads(output))
+
+    walls.sort()
+    median = walls[len(walls) // 2]
+    summary = {
+        'runs': len(walls),
+        'wall_ms_median': round(median, 1),
+        'wall_ms_max': round(walls[-1], 1),
+        'import_ms_median': sorted(report['import_ms'] for report in reports)[len(reports) // 2],
+        'search_ms_median': sorted(report['search_ms'] for report in reports)[len(reports) // 2],
+        'budget_ms': COLD_START_BUDGET_MS,
+        'within_budget': median <= COLD_START_BUDGET_MS,
+    }
+    # Nothing on the query path may pull in NumPy or Pygame
+    check = [sys.executable, '-c',
+             "import sys, connect4_engine as e; e.best_move('33', difficulty='easy'); "
+             "print(sorted({'numpy', 'pygame'} & set(sys.modules)))"]
+    summary['heavy_imports'] = json.loads(subprocess.run(
+        check, capture_output=True, text=True, check=True).stdout.replace("'", '"'))
+    print(json.dumps(summary, indent=2))
+    return 0 if summary['within_budget'] and not summary['heavy_imports'] else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m connect4_engine',
+        description="Print the best move for a position as JSON")
+    parser.add_argument('moves', nargs='?', default='',
+                        help="moves played so far, 0 based columns: '3343' or '3,3,11'")
+    parser.add_argument('--engine', default='minimax', help="minimax or mcts")
+    parser.add_argument('--difficulty', default='medium')
+    parser.add_argument('--time-budget-ms', type=float, default=None)
+    parser.add_argument('--rows', type=int, default=6)
+    parser.add_argument('--cols', type=int, default=7)
+    parser.add_argument('--connect', type=int, default=4)
+    parser.add_argument('--bench', type=int, metavar='RUNS', default=0,
+                        help="time RUNS cold starts against the budget instead")
+    args = parser.parse_args(argv)
+    return bench(args) if args.bench else run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
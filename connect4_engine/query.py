@@ -0,0 +1,62 @@
+from time import perf_counter
+
+from connect4_cli import PIECES, Connect4
+from engines import create_ai
+
+
+def parse_moves(text):
+    """
+    Columns (0 based) from a move string: one digit per move ("3343"), or
+    numbers separated by commas or spaces ("3,3,11") for wider boards.
+    """
+    text = text.strip()
+    if ',' in text or ' ' in text:
+        return [int(move) for move in text.replace(',', ' ').split()]
+    return [int(move) for move in text]
+
+
+def game_from_moves(moves, rows=6, cols=7, connect=4):
+    """
+    Plays `moves` (a move string or a list of columns) from the empty board.
+    Raises ValueError on an illegal move or a move after the game ended.
+    """
+    if isinstance(moves, str):
+        moves = parse_moves(moves)
+    game = Connect4(rows, cols, connect)
+    for number, col in enumerate(moves, 1):
+        if game.game_over:
+            raise ValueError(f"move {number} ({col}) is played after the game ended")
+        if game.get_next_open_row(col) is None:
+            raise ValueError(f"move {number} ({col}) is not a legal column")
+        _, row = game.drop_piece(col)
+        if game.check_win(row, col) or game.check_draw():
+            game.game_over = True
+        else:
+            game.switch_player()
+    return game
+
+
+def best_move(moves, engine='minimax', difficulty='medium', time_budget_ms=None,
+              rows=6, cols=7, connect=4):
+    """
+    Best column for the player to move after `moves`, as a dict with the
+    search's move, score, source, nodes and ms. Raises ValueError if the
+    moves are illegal or the game is already over.
+    """
+    game = game_from_moves(moves, rows, cols, connect)
+    if game.game_over:
+        raise ValueError("the game is already over")
+    ai = create_ai(PIECES[game.current_player], engine, difficulty)
+    start = perf_counter()
+    col = ai.find_best_move(game, time_budget_ms=time_budget_ms)
+    search_ms = (perf_counter() - start) * 1000
+    ai.close()
+    stats = ai.stats
+    return {
+        'move': col,
+        'score': stats.score,
+        'engine': engine,
+        'source': stats.source,
+        'nodes': stats.nodes,
+        'search_ms': round(search_ms, 1),
+    }
@@ -1,24 +1,33 @@
 import pygame
 import sys
 
-from connect4_cli import Connect4
-from minimax_ai import MiniMaxAI
+from collections import deque
 
+from ai_worker import BackgroundAI
+from connect4_cli import P1, P2, PIECES, Connect4
+from engines import create_ai
+from game_records import GameRecord, GameRecordWriter, engine_info
 
-# Initialization
-pygame.init()
-game = Connect4()
-ai_player = MiniMaxAI(player_piece='\033[34m o \033[0m', level=3)
 
-
-# --- CONSTANTS ---
-# Board size
+# Board shape: any size works, CONNECT is how many in a row win
 ROWS = 6
 COLS = 7
+CONNECT = 4
+
+# Game and AI, created by main() so importing this module has no side effects
+game = None
+AI_PLAYER = P2 # The AI plays blue / yellow
+AI_ENGINE = 'minimax' # 'minimax' or 'mcts'
+ai_player = None
+background_ai = None # Searches off the main loop
+renderer = None      # Renderer and Animator of the window, also created by main()
+animator = None
+
 
-# FONT
-FONT = pygame.font.Font("VCR_OSD_MONO.ttf", 60)
-FONT_PLAY_AGAIN = pygame.font.Font("VCR_OSD_MONO.ttf", 80)
+# --- CONSTANTS ---
+# FONT (loaded by main(), fonts need pygame.init())
+FONT = None
+FONT_PLAY_AGAIN = None
 
 # Colors (Retro-Futuristic Palette)
 ALPHA = 128
@@ -33,13 +42,62 @@ BACKGROUND_COLOR = (20, 30, 70) # For the empty slots
 # BACKGROUND_COLOR = (0, 5, 30) # For the empty slots
 
 # Geometry
-SQUARESIZE = 100 # The size of each square on the grid
+# The size of each square on the grid, shrunk so big boards fit on screen
+SQUARESIZE = min(100, 900 // max(COLS, ROWS + 1))
 RADIUS = int(SQUARESIZE / 2 - 5) # Radius of the circles (pieces)
 PADDING = int(SQUARESIZE / 2) # Padding to center the circles
 
-# Ghost surface
-ghost_surface = pygame.Surface((RADIUS * 2, RADIUS * 2), pygame.SRCALPHA)
-drop_speed = 8
+# Animation
+drop_speed = 8      # Initial fall speed, in pixels per 10 ms
+GRAVITY = 0.004     # Fall acceleration, in pixels per ms^2
+MAX_FRAME_STEP = 50 # Longest ms step fed to animations after a stall
+
+# Frame Clock
+FPS = 60
+SHOW_FRAME_TIME = False # Show fps / frame time in the window caption
+clock = pygame.time.Clock()
+
+# AI
+AI_MOVE_DELAY = 600 # Minimum ms between the human's move and the AI's
+PONDER = True       # Search the reply to the hovered column in advance
+SHOW_AI_STATS = False # Show the AI's latest search in the window caption
+SHOW_HINTS = False  # Show the AI's score of every column on the hover row, on the human's turn
+HINT_FONT = None
+ai_move_started = 0
+last_search = None  # SearchStats of the AI's latest search (think or ponder)
+
+
+def remember_search(event, ai, stats):
+    # Search hook; runs on the AI thread, so only store the result
+    global last_search
+    if event == 'end':
+        last_search = stats
+
+
+def format_hint(score):
+    if ai_player.ENGINE == 'mcts': # Win rate
+        return f"{score:.0%}"
+    if score >= 1000000:
+        return "WIN"
+    if score <= -1000000:
+        return "LOSS"
+    return f"{score:+.0f}"
+
+
+def render_hints(analysis):
+    # One label per analysed column, centered above it; the best one glows
+    surface = pygame.Surface((SCREEN_WIDTH, HINT_FONT.get_height()), pygame.SRCALPHA)
+    for col, score in analysis['scores'].items():
+        color = CYAN_GLOW if col == analysis['best'] else NEON_RED
+        text = HINT_FONT.render(format_hint(score), True, color)
+        surface.blit(text, text.get_rect(midtop=(col * SQUARESIZE + PADDING, 0)))
+    return surface
+
+# Game Records
+RECORD_GAMES = None # Path of a game record file to append finished games to
+record_writer = None # Opened once at startup: opening one reads the whole file
+think_ms = {P1: 0, P2: 0}
+turn_started = 0
 
 # End Game
 play_again = None
@@ -51,29 +109,38 @@ SCREEN_WIDTH = COLS * SQUARESIZE
 SCREEN_HEIGHT = (ROWS + 1) * SQUARESIZE # +1 row for the top area
 SCREEN_SIZE = (SCREEN_WIDTH, SCREEN_HEIGHT)
 
-screen = pygame.display.set_mode(SCREEN_SIZE)
-pygame.display.set_caption("Connect 4")
-
 # pygame.display.set_caption("CONNECT FOUR")
 
-def draw_board(screen, board):
+def create_piece_sprite(color, alpha=255):
+    sprite = pygame.Surface((RADIUS * 2, RADIUS * 2), pygame.SRCALPHA)
+    pygame.draw.circle(sprite, (color[0], color[1], color[2], alpha), (RADIUS, RADIUS), RADIUS)
+    return sprite
+
+# Pre-rendered pieces and ghost pieces, per player color
+PIECE_SPRITES = {color: create_piece_sprite(color) for color in (MAGENTA_FURY, ELECTRIC_YELLOW)}
+GHOST_SPRITES = {color: create_piece_sprite(color, ALPHA) for color in (MAGENTA_FURY, ELECTRIC_YELLOW)}
+
+PLAYER_COLORS = {P1: MAGENTA_FURY, P2: ELECTRIC_YELLOW}
+
+def piece_color_of(player):
+    return PLAYER_COLORS[player]
+
+def cell_rect(row, col):
+    # Screen rect of a board cell (+1 row for the top area)
+    return pygame.Rect(col * SQUARESIZE, (row + 1) * SQUARESIZE, SQUARESIZE, SQUARESIZE)
+
+def draw_board(screen, game):
     for col in range(COLS):
         for row in range(ROWS):
-            # Calculate the center of the circle
-            center_x = col * SQUARESIZE + PADDING
-            center_y = (row + 1) * SQUARESIZE + PADDING # +1 to leave space at the top
-
             # Determine the color based on the board state
-            if board[row][col] == '   ':
-                pass
-        
-            elif board[row][col] == '\033[31m o \033[0m': # Player 1 (user)
-                color = MAGENTA_FURY
-                pygame.draw.circle(screen, color, (center_x, center_y), RADIUS)
+            piece = game.get_piece(row, col)
+            if not piece:
+                continue
 
-            else: # Player 2 (AI)
-                color = ELECTRIC_YELLOW
-                pygame.draw.circle(screen, color, (center_x, center_y), RADIUS)
+            center_x = col * SQUARESIZE + PADDING
+            center_y = (row + 1) * SQUARESIZE + PADDING # +1 to leave space at the top
+            sprite = PIECE_SPRITES[piece_color_of(piece)]
+            screen.blit(sprite, (center_x - RADIUS, center_y - RADIUS))
 
 def create_board_surface():
     board_size = (SCREEN_WIDTH, SCREEN_HEIGHT - SQUARESIZE)
@@ -91,197 +158,416 @@ def create_board_surface():
     
     return overlay_surface
 
-def draw_board_overlay(overlay_surface):
-    screen.blit(overlay_surface, (0, SQUARESIZE))
+def create_play_again_button():
+    play_again_rect = pygame.Rect(SCREEN_WIDTH*2/7, SCREEN_HEIGHT*2/7,
+                                  SQUARESIZE*3, SQUARESIZE*2)
+    # Button Background
+    button_background = pygame.Surface(play_again_rect.size, pygame.SRCALPHA)
+    button_background.fill((20, 30, 70, 150))
+
+    # Text Rendering
+    play_text_surface = FONT_PLAY_AGAIN.render("Play", True, NEON_RED)
+    play_text_rect = play_text_surface.get_rect(center=(button_background.get_rect().centerx, button_background.get_rect().centery - 30))
+    again_text_surface = FONT_PLAY_AGAIN.render("Again?", True, NEON_RED)
+    again_text_rect = again_text_surface.get_rect(center=(button_background.get_rect().centerx, button_background.get_rect().centery + 30))
+    button_background.blit(play_text_surface, play_text_rect)
+    button_background.blit(again_text_surface, again_text_rect)
+
+    # # CRT EFFCT
+    # button_height = button_background.get_height()
+    # line_width = 5
+    # lines = int(button_height / line_width) // 2
+
+    # start = 0
+    # for line in range(lines):
+    #     line_start = (0, start)
+    #     line_end = (button_background.get_width(), start)
+    
+    #     pygame.draw.line(button_background, SCANLINE_COLOR, line_start, line_end, line_width)
+    #     start += 2*line_width
+
+    # Button Borders
+    pygame.draw.rect(button_background, NEON_RED, button_background.get_rect(), 8, 4, 4, 4, 4)
+
+    return button_background, play_again_rect
+
+
+class Renderer:
+    """
+    Draws the game from cached layers and only pushes changed rectangles
+    to the display.
+
+    Layers, bottom to top:
+      * under:   background color and the pieces already on the board
+      * sprites drawn "under" the board (falling pieces)
+      * overlay: the board with its holes, never changes
+      * sprites drawn on top (hover ghost, end-game banner, buttons)
+    Each frame gets the full list of sprites; only sprites that moved,
+    changed or disappeared (and cells where a piece landed) are redrawn.
+    """
+
+    def __init__(self, screen, board_surface, game):
+        self.screen = screen
+        self.under = pygame.Surface(SCREEN_SIZE).convert()
+        # The overlay as a full screen layer (transparent top area)
+        self.overlay = pygame.Surface(SCREEN_SIZE, pygame.SRCALPHA).convert_alpha()
+        self.overlay.fill((0, 0, 0, 0))
+        self.overlay.blit(board_surface, (0, SQUARESIZE))
+
+        self._sprites = {}   # name -> (surface, rect, under) drawn last frame
+        self._areas = []     # Rects to redraw this frame
+        self.frame_ms = 0.0  # Time spent in the last present()
+        self.rebuild(game)
+
+    def rebuild(self, game):
+        """
+        Redraws every layer, e.g. after a reset.
+        """
+        self.under.fill(BACKGROUND_COLOR)
+        draw_board(self.under, game)
+        self._sprites = {}
+        self._areas = [self.screen.get_rect()]
+
+    def land_piece(self, row, col, color):
+        """
+        Adds a piece to the static layer and marks only its cell dirty.
+        """
+        center_x = col * SQUARESIZE + PADDING
+        center_y = (row + 1) * SQUARESIZE + PADDING
+        self.under.blit(PIECE_SPRITES[color], (center_x - RADIUS, center_y - RADIUS))
+        self._areas.append(cell_rect(row, col))
+
+    def present(self, sprites):
+        """
+        `sprites` maps a name to (surface, topleft, under) for this frame.
+        Returns the number of rects pushed to the display.
+        """
+        start = pygame.time.get_ticks()
+        current = {}
+        for name, (surface, topleft, under) in sprites.items():
+            current[name] = (surface, surface.get_rect(topleft=topleft), under)
+
+        areas = self._areas
+        for name in self._sprites.keys() | current.keys():
+            old = self._sprites.get(name)
+            new = current.get(name)
+            if old != new:
+                if old is not None:
+                    areas.append(old[1])
+                if new is not None:
+                    areas.append(new[1])
+
+        if areas:
+            screen = self.screen
+            for area in areas:
+                screen.set_clip(area)
+                screen.blit(self.under, area, area)
+                for surface, rect, under in current.values():
+                    if under and rect.colliderect(area):
+                        screen.blit(surface, rect)
+                screen.blit(self.overlay, area, area)
+                for surface, rect, under in current.values():
+                    if not under and rect.colliderect(area):
+                        screen.blit(surface, rect)
+            screen.set_clip(None)
+            pygame.display.update(areas)
+
+        self._sprites = current
+        self._areas = []
+        self.frame_ms = pygame.time.get_ticks() - start
+        return len(areas)
+
+
+class DropAnimation:
+    """
+    A piece falling into (row, col) under gravity. It is advanced by the
+    elapsed ms each frame and lands the piece in the renderer's static
+    layer when it arrives.
+    """
+
+    def __init__(self, col, row, color):
+        self.col = col
+        self.row = row
+        self.color = color
+        self.center_x = col * SQUARESIZE + PADDING
+        self.current_y = SQUARESIZE + PADDING               # Calculate initial y position
+        self.target_y = (row + 1) * SQUARESIZE + PADDING    # Calculate target y position
+        self.velocity = drop_speed / 10
+
+    def update(self, dt):
+        """
+        Advances by `dt` ms. Returns True once the piece has landed.
+        """
+        self.velocity += GRAVITY * dt
+        self.current_y = min(self.current_y + self.velocity * dt, self.target_y)
+        return self.current_y >= self.target_y
+
+    def land(self):
+        renderer.land_piece(self.row, self.col, self.color)
+
+    def sprite(self):
+        # Falling piece, drawn under the board overlay
+        return (PIECE_SPRITES[self.color], (self.center_x - RADIUS, self.current_y - RADIUS), True)
+
+
+class Animator:
+    """
+    Plays queued animations one after another, driven by the main loop.
+    Game logic never waits for it: moves are applied to the game at once
+    and only their pictures are queued.
+    """
+
+    def __init__(self):
+        self.queue = deque()
+
+    @property
+    def busy(self):
+        return bool(self.queue)
+
+    def add(self, animation):
+        self.queue.append(animation)
+
+    def update(self, dt):
+        if self.queue and self.queue[0].update(min(dt, MAX_FRAME_STEP)):
+            self.queue.popleft().land()
+
+    def finish(self):
+        """
+        Interrupts: lands every queued animation immediately.
+        """
+        while self.queue:
+            self.queue.popleft().land()
+
+    def clear(self):
+        self.queue.clear()
+
+    def sprites(self):
+        if self.queue:
+            return {'falling': self.queue[0].sprite()}
+        return {}
+
+
+def record_game(game):
+    if record_writer is None:
+        return
+    engines = (engine_info(), engine_info(ai_player)) # Human is P1
+    record_writer.write(GameRecord.from_game(game, engines, (think_ms[P1], think_ms[P2])))
 
 def update_game_state(game, piece_color):
-    global end_text, end_text_color
+    global end_text, end_text_color, turn_started
+    # Thinking time of the player who just moved
+    now = pygame.time.get_ticks()
+    think_ms[game.current_player] += now - turn_started
+    turn_started = now
+
     if game.check_win():
         game.game_over = True
         end_text_color = piece_color
         end_text = "RED WINS!" if end_text_color == MAGENTA_FURY else "YELLOW WINS!"
 
     elif game.check_draw():
+        game.game_over = True
         end_text = "GRIDLOCKED"
 
     else:
         game.switch_player()
 
+    if game.game_over:
+        record_game(game)
+
 def reset_game():
-    global game, ai_player, play_again, end_text, end_text_color
+    global game, play_again, end_text, end_text_color, think_ms, turn_started
 
     #Reinitialize game
-    game = Connect4()
-    ai_player = MiniMaxAI(player_piece='\033[34m o \033[0m', level=3)
+    game = Connect4(ROWS, COLS, CONNECT)
+    think_ms = {P1: 0, P2: 0}
+    turn_started = pygame.time.get_ticks()
+    background_ai.reset() # Stop any search and clear the AI's tables
+    animator.clear()
+    renderer.rebuild(game)
 
     play_again = None
     end_text = " "
     end_text_color = CYAN_GLOW
 
 
-# Main Game Loop
-column = 0
-hover_column = 0 
-board_surface = create_board_surface()
-play_again_rect = None 
-
-while True:
-    # Event Handling
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            sys.exit()
-
-        # Cursor Position
-        if event.type == pygame.MOUSEMOTION:
-            posx = event.pos[0]  # Get the x-coordinate of the mouse
-            column = posx // SQUARESIZE # Calculate which column it is
-            hover_column = column
-
-        # Mouse Click
-        if event.type == pygame.MOUSEBUTTONDOWN:
-            if game.game_over:
-                if play_again_rect.collidepoint(event.pos):
-                    reset_game()
-                    continue
-                else:
+def main():
+    global game, ai_player, background_ai, FONT, FONT_PLAY_AGAIN, HINT_FONT
+    global renderer, animator, record_writer, ai_move_started
+
+    # Initialization
+    pygame.init()
+    FONT = pygame.font.Font("VCR_OSD_MONO.ttf", 60)
+    FONT_PLAY_AGAIN = pygame.font.Font("VCR_OSD_MONO.ttf", 80)
+    HINT_FONT = pygame.font.Font("VCR_OSD_MONO.ttf", max(12, SQUARESIZE // 5))
+    game = Connect4(ROWS, COLS, CONNECT)
+    ai_player = create_ai(PIECES[AI_PLAYER], AI_ENGINE, 'medium')
+    ai_player.add_hook(remember_search)
+    background_ai = BackgroundAI(ai_player)
+
+    # Main Game Loop
+    screen = pygame.display.set_mode(SCREEN_SIZE)
+    pygame.display.set_caption("Connect 4")
+    column = 0
+    hover_column = 0 
+    board_surface = create_board_surface()
+    renderer = Renderer(screen, board_surface, game)
+    animator = Animator()
+    frame_ms = 0
+    play_again_button, play_again_rect = create_play_again_button()
+    end_message_surface = None
+    last_caption_update = 0
+    shown_hints = None # Analysis the hint surface was rendered from
+    hint_surface = None
+    if RECORD_GAMES is not None:
+        record_writer = GameRecordWriter(RECORD_GAMES)
+
+    while True:
+        # Event Handling
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                background_ai.shutdown()
+                if record_writer is not None:
+                    record_writer.close()
+                sys.exit()
+
+            # Cursor Position
+            if event.type == pygame.MOUSEMOTION:
+                posx = event.pos[0]  # Get the x-coordinate of the mouse
+                column = posx // SQUARESIZE # Calculate which column it is
+                hover_column = column
+
+            # Mouse Click
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                # A click skips any drop still animating
+                animator.finish()
+
+                if game.game_over:
+                    if play_again_rect.collidepoint(event.pos):
+                        reset_game()
+                        continue
+                    else:
+                        continue
+
+                # Wait for the AI's move
+                if background_ai.thinking:
                     continue
- 
-
-            row_index = game.get_next_open_row(column)
-
-            if row_index is not None:
-
-                screen.fill(BACKGROUND_COLOR)
-                draw_board(screen, game.board)
-                background_snapshot = screen.copy()
-
-                # --- ANIMATION LOOP ---
-                current_y = SQUARESIZE + PADDING                     # Calculate initial y position
-                target_y = (row_index + 1) * SQUARESIZE + PADDING    # Calculate target y position
-                center_x = column * SQUARESIZE + PADDING
-
-                # Get the color of the piece in play
-                piece_color = MAGENTA_FURY if game.current_player == '\033[31m o \033[0m' else ELECTRIC_YELLOW
-
-                while current_y < target_y:
-                    current_y = min(current_y + drop_speed, target_y)
-
-                    # Refresh Screen
-                    screen.blit(background_snapshot, (0, 0)) # Background
-                    pygame.draw.circle(screen, piece_color, (center_x, current_y), RADIUS) # Piece falling
-                    draw_board_overlay(board_surface) # Foreground
-                    pygame.display.update()
-                    pygame.time.wait(10)
-                
-                game.drop_piece(column)
-
-                # Update game state after player's move then switch player
-                update_game_state(game, piece_color)
-
-                # ---- AI's TURN ----
-                if not game.game_over and \
-                game.current_player == ai_player.player_piece:
-                    pygame.time.wait(600)
-                    # AI makes its move
-                    ai_col =  ai_player.find_best_move(game.board)
-
-                    screen.fill(BACKGROUND_COLOR)
-                    draw_board(screen, game.board)
-                    draw_board_overlay(board_surface)
-                    background_snapshot = screen.copy()
-
-                    # Animation
-                    piece_color = MAGENTA_FURY if game.current_player == '\033[31m o \033[0m' else ELECTRIC_YELLOW
-                    ai_row_index = game.get_next_open_row(ai_col)
-                    if ai_row_index is not None and ai_col is not None:
-                        ai_current_y = SQUARESIZE + PADDING
-                        ai_target_y = (ai_row_index + 1) * SQUARESIZE + PADDING
-                        ai_center_x = ai_col * SQUARESIZE + PADDING
-
-                        while ai_current_y < ai_target_y:
-                            ai_current_y = min(ai_current_y + drop_speed, ai_target_y)
-
-                            screen.blit(background_snapshot, (0, 0))
-                            pygame.draw.circle(screen, piece_color, (ai_center_x, ai_current_y), RADIUS)
-                            draw_board_overlay(board_surface) 
-                            pygame.display.update()
-                            pygame.time.wait(10)
-
-                        game.drop_piece(ai_col) # Officially drop AI's piece
-                        
-                    # After AI's move, update game state and switch player
-                    update_game_state(game, piece_color)
 
-        else:
-            continue
+                row_index = game.get_next_open_row(column)
 
+                if row_index is not None:
+                    # Get the color of the piece in play
+                    piece_color = piece_color_of(game.current_player)
 
-    # -- DRAWING --
-    hover_row = SQUARESIZE - PADDING # top row
-    center_x = hover_column * SQUARESIZE + PADDING 
+                    # --- ANIMATION ---
+                    game.drop_piece(column)
+                    animator.add(DropAnimation(column, row_index, piece_color))
 
-    # GAME BOARD UPDATE
-    screen.fill(BACKGROUND_COLOR) # Clear screen
-    draw_board(screen, game.board) 
-    draw_board_overlay(board_surface)
-
-    # --- Main Drawing Logic ---
-    if not game.game_over:
-        # Refresh Screen
-        # screen.fill(BACKGROUND_COLOR) # Clear screen
-        # draw_board(screen, game.board) 
+                    # Update game state after player's move then switch player
+                    update_game_state(game, piece_color)
 
-        # Ghost piece drawing
-        hover_row = SQUARESIZE - PADDING # top row
-        center_x = hover_column * SQUARESIZE + PADDING 
-        ghost_surface.fill((0, 0, 0, 0)) # R, G, B, Alpha (0 for fully transparent)
-        piece_color = MAGENTA_FURY if game.current_player == '\033[31m o \033[0m' else ELECTRIC_YELLOW
-        ghost_piece = (piece_color[0], piece_color[1], piece_color[2], ALPHA)
-        pygame.draw.circle(ghost_surface, ghost_piece, (RADIUS, RADIUS), RADIUS)
-        screen.blit(ghost_surface, (center_x - RADIUS, hover_row - RADIUS)) # Top-left position (origin), needed to draw the ghost piece (Convention)
+                    # ---- AI's TURN ----
+                    # The search runs in the background; its move is picked up
+                    # by the main loop below
+                    if not game.game_over and \
+                    game.current_player == AI_PLAYER:
+                        background_ai.think(game)
+                        ai_move_started = pygame.time.get_ticks()
+
+            else:
+                continue
+
+
+        # ---- AI's MOVE ----
+        if background_ai.thinking and \
+        pygame.time.get_ticks() - ai_move_started >= AI_MOVE_DELAY:
+            ai_col = background_ai.poll()
+
+            # poll() is None while the search runs; once it has finished,
+            # a None (aborted search) or full column must not skip the turn
+            if not background_ai.thinking:
+                if ai_col is None or game.get_next_open_row(ai_col) is None:
+                    legal = next(col for col in range(game.cols)
+                                 if game.get_next_open_row(col) is not None)
+                    print(f"AI returned illegal move {ai_col}, playing column {legal} instead",
+                          file=sys.stderr)
+                    ai_col = legal
+
+                # Animation
+                piece_color = piece_color_of(game.current_player)
+                ai_row_index = game.get_next_open_row(ai_col)
+                if ai_row_index is not None:
+                    game.drop_piece(ai_col) # Officially drop AI's piece
+                    animator.add(DropAnimation(ai_col, ai_row_index, piece_color))
 
+                    # After AI's move, update game state and switch player
+                    update_game_state(game, piece_color)
 
-    # --- End-Game Drawing Logic ---
-    else:
-        
-
-        # END GAME MESSAGE
-        end_message_surface = FONT.render(end_text, True, end_text_color)
-        end_message_rect = end_message_surface.get_rect(center=(SCREEN_WIDTH/2, SQUARESIZE/2))
-        screen.blit(end_message_surface, end_message_rect)
-
-        # --- PLAY AGAIN BUTTON ---
-        play_again_rect = pygame.Rect(SCREEN_WIDTH*2/7, SCREEN_HEIGHT*2/7,
-                                      SQUARESIZE*3, SQUARESIZE*2)
-        # Button Background
-        button_background = pygame.Surface(play_again_rect.size, pygame.SRCALPHA)
-        button_background.fill((20, 30, 70, 150))
-
-        # Text Rendering
-        play_text_surface = FONT_PLAY_AGAIN.render("Play", True, NEON_RED)
-        play_text_rect = play_text_surface.get_rect(center=(button_background.get_rect().centerx, button_background.get_rect().centery - 30))
-        again_text_surface = FONT_PLAY_AGAIN.render("Again?", True, NEON_RED)
-        again_text_rect = again_text_surface.get_rect(center=(button_background.get_rect().centerx, button_background.get_rect().centery + 30))
-        button_background.blit(play_text_surface, play_text_rect)
-        button_background.blit(again_text_surface, again_text_rect)
-
-        # # CRT EFFCT
-        # button_height = button_background.get_height()
-        # line_width = 5
-        # lines = int(button_height / line_width) // 2
-
-        # start = 0
-        # for line in range(lines):
-        #     line_start = (0, start)
-        #     line_end = (button_background.get_width(), start)
-        
-        #     pygame.draw.line(button_background, SCANLINE_COLOR, line_start, line_end, line_width)
-        #     start += 2*line_width
-
-        # Button Borders
-        pygame.draw.rect(button_background, NEON_RED, button_background.get_rect(), 8, 4, 4, 4, 4)
-
-        screen.blit(button_background, play_again_rect.topleft)
-
-    # Update the Display
-    pygame.display.update()
+        # ---- PONDERING ----
+        # While the human hovers, search the AI's reply to the hovered column
+        if PONDER and not game.game_over and not background_ai.thinking and \
+        game.current_player != AI_PLAYER:
+            if game.get_next_open_row(hover_column) is not None:
+                ponder_game = game.copy()
+                ponder_game.drop_piece(hover_column)
+                ponder_game.switch_player()
+                background_ai.ponder(ponder_game)
+
+        # ---- HINTS ----
+        # Analysis runs in the background too; the hint labels are only
+        # re-rendered when a new result comes in
+        hints = None
+        if SHOW_HINTS and not game.game_over and not background_ai.thinking and \
+        game.current_player != AI_PLAYER:
+            hints = background_ai.analysis(game)
+            if hints is None or not hints['complete']:
+                background_ai.analyse(game) # Keeps refining until it is complete
+            if hints is not None and hints is not shown_hints:
+                shown_hints = hints
+                hint_surface = render_hints(hints)
+
+        # -- DRAWING --
+        animator.update(frame_ms)
+        sprites = animator.sprites()
+
+        # --- Main Drawing Logic ---
+        if not game.game_over:
+            # Ghost piece drawing (hidden while the AI is thinking)
+            hover_row = SQUARESIZE - PADDING # top row
+            center_x = hover_column * SQUARESIZE + PADDING 
+            ghost = GHOST_SPRITES[piece_color_of(game.current_player)]
+            if not background_ai.thinking:
+                sprites['ghost'] = (ghost, (center_x - RADIUS, hover_row - RADIUS), False) # Top-left position (origin), needed to draw the ghost piece (Convention)
+            if hints is not None:
+                sprites['hints'] = (hint_surface, (0, 0), False)
+            end_message_surface = None
+
+        # --- End-Game Drawing Logic ---
+        # (once the last piece has landed)
+        elif not animator.busy:
+            # END GAME MESSAGE (rendered once per game)
+            if end_message_surface is None:
+                end_message_surface = FONT.render(end_text, True, end_text_color)
+            end_message_rect = end_message_surface.get_rect(center=(SCREEN_WIDTH/2, SQUARESIZE/2))
+            sprites['end_text'] = (end_message_surface, end_message_rect.topleft, False)
+
+            # --- PLAY AGAIN BUTTON ---
+            sprites['play_again'] = (play_again_button, play_again_rect.topleft, False)
+
+        # Update only what changed, then sleep until the next frame
+        renderer.present(sprites)
+        frame_ms = clock.tick(FPS)
+
+        if (SHOW_FRAME_TIME or SHOW_AI_STATS) and pygame.time.get_ticks() - last_caption_update > 1000:
+            last_caption_update = pygame.time.get_ticks()
+            caption = "Connect 4"
+            if SHOW_FRAME_TIME:
+                caption += (f"  {clock.get_fps():.0f} fps  "
+                            f"{clock.get_rawtime()} ms/frame  {renderer.frame_ms:.0f} ms render")
+            if SHOW_AI_STATS and last_search is not None:
+                caption += f"  AI: {last_search.summary()}"
+            pygame.display.set_caption(caption)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+from time import perf_counter
+
+from bitboard import center_order, mirror_columns, shape_masks, winning_cells
+from transposition import UPPER, TranspositionTable
+
+# Nodes between two clock / stop event checks
+CHECK_INTERVAL = 256
+
+
+class SolverAborted(Exception):
+    """Raised when the solver goes over its node limit, its deadline or
+    its stop event is set."""
+
+
+class EndgameSolver:
+    """
+    Exact Connect 4 solver for positions with few empty cells.
+
+    Negamax with alpha-beta on (side to move pieces, occupied cells)
+    bitboards, driven by null-window searches that bisect the score range.
+    Scores are from the side to move's point of view:
+      0 = draw, > 0 = win, < 0 = loss, and the further from 0 the sooner
+      (a win on your k-th own move from now scores (cells + 1) // 2 - k
+      over the cells left on the board).
+    Only moves that do not hand the opponent an immediate win are searched,
+    and upper bounds are kept in a TranspositionTable across calls. With
+    `symmetry` a position and its left-right mirror share one entry, and
+    symmetric positions only search the columns up to the middle. It is
+    off by default: this close to the end mirrored positions rarely meet,
+    so mirroring every key costs more time than the nodes it saves.
+    """
+
+    def __init__(self, tt_buckets=1 << 16, node_limit=None, symmetry=False):
+        self.tt = TranspositionTable(tt_buckets)
+        self.node_limit = node_limit
+        self.symmetry = symmetry
+        self.nodes = 0
+        self._deadline = None
+        self._stop_event = None
+        self._check_at = float('inf')
+
+    def reset(self):
+        self.tt.clear()
+
+    # --- Bitboard Helpers ---
+    def _setup(self, position):
+        self.rows = position.rows
+        self.cols = position.cols
+        self.connect = position.connect
+        self.height = position.height
+        self.cells = position.rows * position.cols
+        self.bottom, self.board, self.columns = shape_masks(position.rows, position.cols)
+        self.order = center_order(position.cols)
+        # Columns to search in a symmetric position
+        self.half_order = tuple(col for col in self.order if col <= (position.cols - 1) // 2)
+
+    def _start(self, deadline, stop_event):
+        # `deadline` is a perf_counter() time
+        self.nodes = 0
+        self._deadline = deadline
+        self._stop_event = stop_event
+        self._check_at = 0
+
+    def _check_limits(self):
+        if self.node_limit is not None and self.nodes > self.node_limit:
+            raise SolverAborted
+        if self._stop_event is not None and self._stop_event.is_set():
+            raise SolverAborted
+        if self._deadline is not None and perf_counter() >= self._deadline:
+            raise SolverAborted
+        self._check_at = self.nodes + CHECK_INTERVAL
+        if self.node_limit is not None:
+            self._check_at = min(self._check_at, self.node_limit + 1)
+
+    def _winning_cells(self, pieces, mask):
+        """
+        Empty cells that would complete a line for `pieces`.
+        """
+        return winning_cells(pieces, mask, self.height, self.board, self.connect)
+
+    def _non_losing_moves(self, current, mask):
+        """
+        Bitmask of playable cells that do not let the opponent win at once.
+        """
+        possible = (mask + self.bottom) & self.board
+        opponent_wins = self._winning_cells(current ^ mask, mask)
+        forced = possible & opponent_wins
+        if forced:
+            if forced & (forced - 1):
+                return 0 # Two threats, cannot block both
+            possible = forced
+        # Never play directly under an opponent's winning cell
+        return possible & ~(opponent_wins >> 1)
+
+    # --- Search ---
+    def _negamax(self, current, mask, moves, alpha, beta):
+        # Precondition: the side to move cannot win immediately
+        self.nodes += 1
+        if self.nodes >= self._check_at:
+            self._check_limits()
+
+        playable = self._non_losing_moves(current, mask)
+        if not playable:
+            return -((self.cells - moves) // 2)
+        if moves >= self.cells - 2:
+            return 0 # Draw, neither side can win with the last two cells
+
+        lowest = -((self.cells - 2 - moves) // 2)
+        if alpha < lowest:
+            alpha = lowest
+            if alpha >= beta:
+                return alpha
+
+        highest = (self.cells - 1 - moves) // 2
+        key = current + mask
+        order = self.order
+        if self.symmetry:
+            mirror = mirror_columns(key, self.height, self.cols)
+            if mirror == key:
+                order = self.half_order
+            elif mirror < key:
+                key = mirror
+        entry = self.tt.probe(key)
+        if entry is not None:
+            highest = entry[3]
+        if beta > highest:
+            beta = highest
+            if alpha >= beta:
+                return beta
+
+        # Order by how many new threats a move creates, then center-out
+        candidates = []
+        for index, col in enumerate(order):
+            move = playable & self.columns[col]
+            if move:
+                threats = self._winning_cells(current | move, mask).bit_count()
+                candidates.append((-threats, index, move))
+        candidates.sort()
+
+        opponent = current ^ mask
+        for _, _, move in candidates:
+            new_mask = mask | move
+            score = -self._negamax(opponent, new_mask, moves + 1, -beta, -alpha)
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+
+        self.tt.store(key, 0, UPPER, alpha, None)
+        return alpha
+
+    def _solve(self, current, mask, moves):
+        # Exact score by null-window bisection of the possible score range
+        if self._winning_cells(current, mask) & ((mask + self.bottom) & self.board):
+            return (self.cells + 1 - moves) // 2
+
+        low = -((self.cells - moves) // 2)
+        high = (self.cells + 1 - moves) // 2
+        while low < high:
+            middle = low + (high - low) // 2
+            if middle <= 0 and low // 2 < middle:
+                middle = low // 2
+            elif middle >= 0 and high // 2 > middle:
+                middle = high // 2
+            result = self._negamax(current, mask, moves, middle, middle + 1)
+            if result <= middle:
+                high = result
+            else:
+                low = result
+        return low
+
+    def solve(self, position, deadline=None, stop_event=None):
+        """
+        Returns the exact score of `position` for the side to move. Raises
+        SolverAborted past node_limit, the perf_counter() `deadline` or
+        once `stop_event` is set.
+        """
+        self._setup(position)
+        self._start(deadline, stop_event)
+        current = position.masks[position.to_move]
+        mask = position.masks[0] | position.masks[1]
+        return self._solve(current, mask, position.moves)
+
+    def best_move(self, position, deadline=None, stop_event=None):
+        """
+        Returns (column, score) of a best move for the side to move, where
+        score is the exact value of the position. Raises SolverAborted like
+        solve().
+        """
+        self._setup(position)
+        self._start(deadline, stop_event)
+        current = position.masks[position.to_move]
+        mask = position.masks[0] | position.masks[1]
+        moves = position.moves
+        possible = (mask + self.bottom) & self.board
+
+        # Immediate win
+        wins = self._winning_cells(current, mask) & possible
+        for col in self.order:
+            if wins & self.columns[col]:
+                return col, (self.cells + 1 - moves) // 2
+
+        best_col, best_score = None, None
+        opponent = current ^ mask
+        order = self.order
+        if self.symmetry and mirror_columns(current + mask, self.height, self.cols) == current + mask:
+            order = self.half_order
+        for col in order:
+            move = possible & self.columns[col]
+            if not move:
+                continue
+            new_mask = mask | move
+
+            if self._winning_cells(opponent, new_mask) & ((new_mask + self.bottom) & self.board):
+                score = -((self.cells - moves) // 2) # Opponent wins next move
+            elif best_score is None:
+                score = -self._solve(opponent, new_mask, moves + 1)
+            elif -self._negamax(opponent, new_mask, moves + 1, -(best_score + 1), -best_score) > best_score:
+                # Null-window test says it beats the best so far; get its value
+                score = -self._solve(opponent, new_mask, moves + 1)
+            else:
+                continue
+
+            if best_score is None or score > best_score:
+                best_col, best_score = col, score
+        return best_col, best_score
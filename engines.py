@@ -0,0 +1,20 @@
+from mcts_ai import MCTSAI
+from minimax_ai import MiniMaxAI
+
+# Engine names accepted by create_ai, the CLI, the GUI and tournament specs
+ENGINES = {
+    'minimax': MiniMaxAI,
+    'mcts': MCTSAI,
+}
+
+
+def create_ai(player_piece, engine='minimax', difficulty=None, **kwargs):
+    """
+    Builds an AI by engine name, either from a difficulty preset or from
+    the engine's own keyword arguments.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"unknown engine {engine!r} (choose from {', '.join(ENGINES)})")
+    if difficulty is not None:
+        return ENGINES[engine].from_difficulty(player_piece, difficulty)
+    return ENGINES[engine](player_piece, **kwargs)
@@ -0,0 +1,223 @@
+import argparse
+import os
+import struct
+import time
+
+from connect4_cli import P1, P2, Connect4
+
+# File layout: a header, then records back to back until the end of file.
+#   header: magic, version, pad
+#   record: timestamp (unix seconds), move count, rows, cols, connect,
+#           result, two engines (kind, level, time budget ms), think ms
+#           per player, then the moves packed LSB first,
+#           bits_per_move(cols) bits each
+# Version 1 records have no connect byte (always 4); they are still read.
+MAGIC = b'C4GR'
+VERSION = 2
+HEADER = struct.Struct('<4sB3x')
+RECORD = struct.Struct('<IHBBBB' + 'BBH' * 2 + 'II')
+RECORD_V1 = struct.Struct('<IHBBB' + 'BBH' * 2 + 'II')
+
+# Results
+DRAW = 0
+UNFINISHED = 3 # P1 / P2 for a win
+
+# Engine kinds
+HUMAN = 0
+MINIMAX = 1
+MCTS = 2
+ENGINE_KINDS = {'minimax': MINIMAX, 'mcts': MCTS}
+
+
+def bits_per_move(cols):
+    # 3 bits for the standard 7 columns
+    return max(1, (cols - 1).bit_length())
+
+
+def engine_info(ai=None):
+    """
+    (kind, level, time budget ms) describing who played a side;
+    `ai` is None for a human.
+    """
+    if ai is None:
+        return HUMAN, 0, 0
+    return (ENGINE_KINDS[ai.ENGINE], min(getattr(ai, 'level', 0), 255),
+            min(int(ai.time_budget_ms or 0), 0xFFFF))
+
+
+class GameRecord:
+    __slots__ = ('moves', 'rows', 'cols', 'connect', 'result', 'engines', 'think_ms', 'timestamp')
+
+    def __init__(self, moves, rows=6, cols=7, result=UNFINISHED, engines=None,
+                 think_ms=(0, 0), timestamp=None, connect=4):
+        self.moves = moves           # Columns in play order, P1 first
+        self.rows = rows
+        self.cols = cols
+        self.connect = connect
+        self.result = result         # DRAW, P1, P2 or UNFINISHED
+        self.engines = engines or (engine_info(), engine_info())
+        self.think_ms = think_ms     # Total thinking time of P1 and P2
+        self.timestamp = int(time.time()) if timestamp is None else timestamp
+
+    @classmethod
+    def from_game(cls, game, engines=None, think_ms=(0, 0)):
+        """
+        Record of a Connect4 game so far. A finished game's result is the
+        player who made the last move, or a draw on a full board.
+        """
+        if not game.game_over:
+            result = UNFINISHED
+        elif game.check_win():
+            result = game.current_player
+        else:
+            result = DRAW
+        return cls(list(game.history), game.rows, game.cols, result, engines,
+                   tuple(int(ms) for ms in think_ms), connect=game.connect)
+
+    def encode(self):
+        bits = bits_per_move(self.cols)
+        packed = 0
+        for index, col in enumerate(self.moves):
+            packed |= col << (index * bits)
+        size = (len(self.moves) * bits + 7) // 8
+        (kind1, level1, budget1), (kind2, level2, budget2) = self.engines
+        return RECORD.pack(self.timestamp, len(self.moves), self.rows, self.cols, self.connect,
+                           self.result, kind1, level1, budget1, kind2, level2, budget2,
+                           *self.think_ms) + packed.to_bytes(size, 'little')
+
+    @classmethod
+    def decode(cls, fields, data, version=VERSION):
+        # `fields` are the unpacked RECORD (RECORD_V1 for version 1),
+        # `data` the packed moves
+        if version == 1:
+            fields = fields[:4] + (4,) + fields[4:]
+        (timestamp, count, rows, cols, connect, result, kind1, level1, budget1,
+         kind2, level2, budget2, think1, think2) = fields
+        bits = bits_per_move(cols)
+        mask = (1 << bits) - 1
+        packed = int.from_bytes(data, 'little')
+        moves = [(packed >> (index * bits)) & mask for index in range(count)]
+        return cls(moves, rows, cols, result, ((kind1, level1, budget1), (kind2, level2, budget2)),
+                   (think1, think2), timestamp, connect)
+
+
+class GameRecordWriter:
+    """
+    Appends GameRecords to a file, writing the file header first if the
+    file is new (an existing file must be of the current version). Every
+    record goes out in a single write and is flushed, so a crash can at
+    worst cut off the last record. Opening an existing file walks its
+    records and truncates such a partial tail, so new records never land
+    after one; that read grows with the file, so keep one writer open for
+    a whole session rather than one per game.
+
+        with GameRecordWriter('games.c4r') as writer:
+            writer.write(GameRecord.from_game(game, engines, think_ms))
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'a+b') # Writes always go to the end
+        self._file.seek(0)
+        header = self._file.read(HEADER.size)
+        if len(header) < HEADER.size:
+            # New file, or one cut off while its header was written
+            if not HEADER.pack(MAGIC, VERSION).startswith(header):
+                self._file.close()
+                raise ValueError(f"{path} is not a version {VERSION} game record file")
+            self._file.truncate(0)
+            self._file.write(HEADER.pack(MAGIC, VERSION))
+            self._file.flush()
+        else:
+            magic, version = HEADER.unpack(header)
+            if magic != MAGIC or version != VERSION:
+                self._file.close()
+                raise ValueError(f"{path} is not a version {VERSION} game record file")
+            end = HEADER.size
+            for _ in _scan(self._file, RECORD):
+                end = self._file.tell()
+            if end < os.path.getsize(path):
+                self._file.truncate(end)
+        self.count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, record):
+        self._file.write(record.encode())
+        self._file.flush()
+        self.count += 1
+
+    def close(self):
+        self._file.close()
+
+
+def _scan(file, record):
+    # (fields, packed moves) of each complete record from the file's
+    # current offset; stops at the end of file or at a record cut off
+    # mid-write
+    while True:
+        data = file.read(record.size)
+        if len(data) < record.size:
+            return
+        fields = record.unpack(data)
+        size = (fields[1] * bits_per_move(fields[3]) + 7) // 8
+        data = file.read(size)
+        if len(data) < size:
+            return
+        yield fields, data
+
+
+def read_records(path):
+    """
+    Yields every GameRecord in `path`, reading one record at a time.
+    """
+    with open(path, 'rb') as file:
+        header = file.read(HEADER.size)
+        if len(header) < HEADER.size:
+            return
+        magic, version = HEADER.unpack(header)
+        if magic != MAGIC or version not in (1, VERSION):
+            raise ValueError(f"{path} is not a game record file")
+        record = RECORD_V1 if version == 1 else RECORD
+        for fields, data in _scan(file, record):
+            yield GameRecord.decode(fields, data, version)
+
+
+def replay(record):
+    """
+    Plays a record back, yielding (game, col) after each move, with the
+    next player to move as current player (or the winner once the game is
+    over). The same Connect4 object is updated in place; copy() it to keep
+    a position.
+    """
+    game = Connect4(record.rows, record.cols, record.connect)
+    for col in record.moves:
+        if game.game_over or game.get_next_open_row(col) is None:
+            raise ValueError(f"illegal move {col} in record")
+        _, row = game.drop_piece(col)
+        if game.check_win(row, col) or game.check_draw():
+            game.game_over = True
+        else:
+            game.switch_player()
+        yield game, col
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarise a game record file")
+    parser.add_argument('path')
+    args = parser.parse_args()
+
+    games = moves = 0
+    results = {DRAW: 0, P1: 0, P2: 0, UNFINISHED: 0}
+    for record in read_records(args.path):
+        games += 1
+        moves += len(record.moves)
+        results[record.result] += 1
+    size = os.path.getsize(args.path)
+    print(f"{games} games, {moves} moves, {size} bytes ({size / max(games, 1):.1f} bytes/game)")
+    print(f"P1 wins {results[P1]}  P2 wins {results[P2]}  draws {results[DRAW]}  "
+          f"unfinished {results[UNFINISHED]}")
@@ -0,0 +1,384 @@
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import count
+from time import perf_counter
+
+from connect4_cli import P1, P2, PIECES, Connect4
+from game_records import MINIMAX, GameRecord, GameRecordWriter, engine_info
+from minimax_ai import DIFFICULTIES, MiniMaxAI
+
+# Per-request time budgets are clamped to this range (ms)
+MIN_TIME_BUDGET_MS = 10
+MAX_TIME_BUDGET_MS = 2000
+# Latency samples kept for the metrics percentiles
+LATENCY_WINDOW = 2000
+
+
+# --- Worker Side ---
+# One MiniMaxAI per difficulty and worker process, shared by every game
+# the worker serves. Its tables are keyed by position with the side to move
+# as side 0, so entries from one game stay valid in another.
+_worker_ais = {}
+
+
+def _worker_ai(difficulty):
+    ai = _worker_ais.get(difficulty)
+    if ai is None:
+        ai = _worker_ais[difficulty] = MiniMaxAI.from_difficulty(PIECES[P2], difficulty)
+    return ai
+
+
+def _search(difficulty, time_budget_ms, game):
+    """
+    Returns (column, nodes, search ms) for the current player of `game`.
+    """
+    ai = _worker_ai(difficulty)
+    start = perf_counter()
+    col = ai.find_best_move(game, time_budget_ms=time_budget_ms)
+    return col, ai.stats.nodes, (perf_counter() - start) * 1000
+
+
+def _analyse(difficulty, time_budget_ms, game):
+    """
+    Returns (MiniMaxAI.analyse result, nodes, search ms) for the current
+    player of `game`. The worker's analysis cache carries over, so asking
+    again about the same position refines it.
+    """
+    ai = _worker_ai(difficulty)
+    start = perf_counter()
+    analysis = ai.analyse(game, time_budget_ms=time_budget_ms)
+    return analysis, ai.stats.nodes, (perf_counter() - start) * 1000
+
+
+# --- Server Side ---
+def board_rows(game):
+    return [list(game.cells[row * game.cols:(row + 1) * game.cols]) for row in range(game.rows)]
+
+
+def latency_summary(samples):
+    ordered = sorted(samples)
+    if not ordered:
+        return {'count': 0, 'mean': 0.0, 'p50': 0.0, 'p95': 0.0, 'max': 0.0}
+    percentile = lambda fraction: ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+    return {
+        'count': len(ordered),
+        'mean': round(sum(ordered) / len(ordered), 2),
+        'p50': round(percentile(0.5), 2),
+        'p95': round(percentile(0.95), 2),
+        'max': round(ordered[-1], 2),
+    }
+
+
+class Session:
+    __slots__ = ('game', 'difficulty', 'ai_player', 'winner', 'think_ms', 'turn_started')
+
+    def __init__(self, difficulty, ai_player=P2):
+        self.game = Connect4()
+        self.difficulty = difficulty
+        self.ai_player = ai_player
+        self.winner = None # Player id, once someone has won
+        self.think_ms = {P1: 0.0, P2: 0.0}
+        self.turn_started = perf_counter()
+
+    def record(self):
+        settings = DIFFICULTIES[self.difficulty]
+        ai = (MINIMAX, min(settings['level'], 255), settings['time_budget_ms'])
+        engines = (ai, engine_info()) if self.ai_player == P1 else (engine_info(), ai)
+        return GameRecord.from_game(self.game, engines, (self.think_ms[P1], self.think_ms[P2]))
+
+
+class GameServer:
+    """
+    Hosts many Connect4 games against MiniMaxAI over newline delimited JSON
+    on a plain TCP socket.
+
+    Every request is one JSON object per line and gets exactly one JSON
+    object back, echoing the request's "id" if it had one:
+
+      {"op": "new", "difficulty": "medium", "ai_first": false}
+      {"op": "move", "game": 3, "col": 4, "time_budget_ms": 200}
+      {"op": "state", "game": 3}
+      {"op": "analyse", "game": 3, "time_budget_ms": 200}
+      {"op": "close", "game": 3}
+      {"op": "metrics"}
+
+    Game replies carry the board (rows of player ids, row 0 at the top),
+    the AI's reply column, and "winner" (1, 2 or null) and "draw" once the
+    game ends. "analyse" scores every column for the player to move:
+    "scores" has one entry per column (null if full), plus "best",
+    "depth" and "complete" (see MiniMaxAI.analyse). Errors reply
+    {"ok": false, "error": ...}.
+
+    AI searches run in a process pool of `workers` processes, so the event
+    loop only waits on futures. At most `max_queue` searches may wait for
+    a free worker; past that, moves and analyses are refused with "busy"
+    (moves before they are applied). Games belong to the connection that created them and are
+    dropped when it closes. With `record_path`, finished games are
+    appended there as GameRecords.
+    """
+
+    def __init__(self, workers=None, max_queue=None, max_games=10000, record_path=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue if max_queue is not None else 8 * self.workers
+        self.max_games = max_games
+        # Spawned, not forked: a forked worker would inherit the sockets of
+        # every open connection and keep them from ever closing
+        self.executor = ProcessPoolExecutor(max_workers=self.workers,
+                                            mp_context=multiprocessing.get_context('spawn'))
+        self._slots = asyncio.Semaphore(self.workers)
+        self._game_ids = count(1)
+        self.records = GameRecordWriter(record_path) if record_path else None
+
+        # Metrics
+        self.games_active = 0
+        self.games_started = 0
+        self.games_finished = 0
+        self.connections = 0
+        self.requests = 0
+        self.rejected = 0
+        self.queued = 0    # Searches waiting for a worker
+        self.in_flight = 0 # Searches running in a worker
+        self.wait_ms = deque(maxlen=LATENCY_WINDOW)   # Time queued
+        self.search_ms = deque(maxlen=LATENCY_WINDOW) # Time in the worker
+        self.move_ms = deque(maxlen=LATENCY_WINDOW)   # Whole move request
+        self.nodes = 0
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+        if self.records is not None:
+            self.records.close()
+
+    def metrics(self):
+        return {
+            'workers': self.workers,
+            'connections': self.connections,
+            'games_active': self.games_active,
+            'games_started': self.games_started,
+            'games_finished': self.games_finished,
+            'requests': self.requests,
+            'rejected': self.rejected,
+            'queue_depth': self.queued,
+            'max_queue': self.max_queue,
+            'in_flight': self.in_flight,
+            'nodes': self.nodes,
+            'wait_ms': latency_summary(self.wait_ms),
+            'search_ms': latency_summary(self.search_ms),
+            'move_ms': latency_summary(self.move_ms),
+        }
+
+    # --- Connections ---
+    async def start(self, host='127.0.0.1', port=8765):
+        return await asyncio.start_server(self.handle_client, host, port)
+
+    async def handle_client(self, reader, writer):
+        self.connections += 1
+        games = {}
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                self.requests += 1
+                request = {}
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        request = {}
+                        raise ValueError("a request must be a JSON object")
+                    response = await self.handle(request, games)
+                except (ValueError, TypeError) as error:
+                    response = {'ok': False, 'error': str(error)}
+                if 'id' in request:
+                    response['id'] = request['id']
+                writer.write(json.dumps(response).encode() + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.connections -= 1
+            self.games_active -= len(games)
+            writer.close()
+
+    async def handle(self, request, games):
+        op = request.get('op')
+        if op == 'new':
+            return await self._new_game(request, games)
+        if op == 'metrics':
+            return {'ok': True, 'metrics': self.metrics()}
+
+        game_id = request.get('game')
+        if game_id not in games:
+            return {'ok': False, 'error': f"unknown game {game_id}"}
+        if op == 'move':
+            return await self._move(request, game_id, games[game_id])
+        if op == 'state':
+            return self._game_reply(game_id, games[game_id])
+        if op == 'analyse':
+            return await self._analyse(request, game_id, games[game_id])
+        if op == 'close':
+            del games[game_id]
+            self.games_active -= 1
+            return {'ok': True, 'game': game_id}
+        return {'ok': False, 'error': f"unknown op {op!r}"}
+
+    # --- Games ---
+    def _game_reply(self, game_id, session, ai_col=None):
+        game = session.game
+        return {'ok': True, 'game': game_id, 'board': board_rows(game),
+                'to_move': game.current_player, 'ai_col': ai_col, 'winner': session.winner,
+                'draw': game.game_over and session.winner is None}
+
+    async def _new_game(self, request, games):
+        difficulty = request.get('difficulty', 'medium')
+        if difficulty not in DIFFICULTIES:
+            return {'ok': False, 'error': f"unknown difficulty {difficulty!r}"}
+        if self.games_active >= self.max_games or \
+           (request.get('ai_first') and self.queued >= self.max_queue):
+            self.rejected += 1
+            return {'ok': False, 'error': "busy"}
+
+        time_budget_ms = self._time_budget(difficulty, request.get('time_budget_ms'))
+        game_id = next(self._game_ids)
+        session = Session(difficulty, P1 if request.get('ai_first') else P2)
+        games[game_id] = session
+        self.games_active += 1
+        self.games_started += 1
+
+        ai_col = None
+        if request.get('ai_first'):
+            ai_col = await self._ai_move(session, time_budget_ms)
+        return self._game_reply(game_id, session, ai_col)
+
+    def _time_budget(self, difficulty, time_budget_ms):
+        """
+        The search time budget of a request, clamped to the allowed range.
+        Raises ValueError (an error reply) for anything but a finite number,
+        so callers check it before touching the game.
+        """
+        if time_budget_ms is None:
+            return DIFFICULTIES[difficulty]['time_budget_ms']
+        if isinstance(time_budget_ms, bool) or not isinstance(time_budget_ms, (int, float)) \
+           or not math.isfinite(time_budget_ms):
+            raise ValueError(f"bad time_budget_ms {time_budget_ms!r}")
+        return min(max(float(time_budget_ms), MIN_TIME_BUDGET_MS), MAX_TIME_BUDGET_MS)
+
+    def _play(self, session, col):
+        game = session.game
+        ok, row = game.drop_piece(col)
+        if not ok:
+            return False
+        now = perf_counter()
+        session.think_ms[game.current_player] += (now - session.turn_started) * 1000
+        session.turn_started = now
+        if game.check_win(row, col):
+            game.game_over = True
+            session.winner = game.current_player
+        elif game.check_draw():
+            game.game_over = True
+        else:
+            game.switch_player()
+        if game.game_over:
+            self.games_finished += 1
+            if self.records is not None:
+                self.records.write(session.record())
+        return True
+
+    async def _move(self, request, game_id, session):
+        start = perf_counter()
+        game = session.game
+        col = request.get('col')
+        if game.game_over:
+            return {'ok': False, 'error': "game over", 'game': game_id}
+        if not isinstance(col, int) or isinstance(col, bool) or game.get_next_open_row(col) is None:
+            return {'ok': False, 'error': f"illegal move {col!r}", 'game': game_id}
+        time_budget_ms = self._time_budget(session.difficulty, request.get('time_budget_ms'))
+        # Refuse before the move is applied, so the client can just retry
+        if self.queued >= self.max_queue:
+            self.rejected += 1
+            return {'ok': False, 'error': "busy", 'game': game_id}
+
+        self._play(session, col)
+        ai_col = None
+        if not game.game_over:
+            ai_col = await self._ai_move(session, time_budget_ms)
+        self.move_ms.append((perf_counter() - start) * 1000)
+        return self._game_reply(game_id, session, ai_col)
+
+    async def _analyse(self, request, game_id, session):
+        game = session.game
+        if game.game_over:
+            return {'ok': False, 'error': "game over", 'game': game_id}
+        time_budget_ms = self._time_budget(session.difficulty, request.get('time_budget_ms'))
+        if self.queued >= self.max_queue:
+            self.rejected += 1
+            return {'ok': False, 'error': "busy", 'game': game_id}
+
+        analysis = await self._run(_analyse, session, time_budget_ms)
+        return {'ok': True, 'game': game_id, 'to_move': game.current_player,
+                'best': analysis['best'],
+                'scores': [analysis['scores'].get(col) for col in range(game.cols)],
+                'depth': analysis['depth'], 'complete': analysis['complete']}
+
+    async def _ai_move(self, session, time_budget_ms):
+        col = await self._run(_search, session, time_budget_ms)
+        self._play(session, col)
+        return col
+
+    async def _run(self, worker, session, time_budget_ms):
+        """
+        Runs worker(difficulty, time budget, game) in the process pool once
+        a slot is free and returns its result. `time_budget_ms` comes from
+        _time_budget.
+        """
+        queued_at = perf_counter()
+        self.queued += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.queued -= 1
+        self.wait_ms.append((perf_counter() - queued_at) * 1000)
+
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result, nodes, search_ms = await loop.run_in_executor(
+                self.executor, worker, session.difficulty, time_budget_ms, session.game)
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+        self.search_ms.append(search_ms)
+        self.nodes += nodes
+        return result
+
+
+async def serve(host, port, workers, max_queue, record_path):
+    server = GameServer(workers, max_queue, record_path=record_path)
+    listener = await server.start(host, port)
+    print(f"Serving Connect 4 on {host}:{port} with {server.workers} AI workers")
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Connect 4 game server (JSON lines over TCP)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=None, help="AI processes (default: all cores)")
+    parser.add_argument('--max-queue', type=int, default=None,
+                        help="searches allowed to wait for a worker before moves are refused")
+    parser.add_argument('--record', help="append finished games to this game record file")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.max_queue, args.record))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,115 @@
+from functools import lru_cache
+
+from bitboard import window_masks
+
+# Every window is tracked as one small code:
+#   side 0 count * (connect + 1) + side 1 count
+def side_steps(connect=4):
+    return (connect + 1, 1)
+
+
+@lru_cache(maxsize=None)
+def cell_windows(rows, cols, connect=4):
+    """
+    For every bit index of a Position of this shape, the tuple of window
+    ids (indices into window_masks) that contain that cell. Sentinel bits
+    map to an empty tuple.
+    """
+    masks = window_masks(rows, cols, connect)
+    height = rows + 1
+    table = []
+    for bit in range(cols * height):
+        table.append(tuple(w for w, mask in enumerate(masks) if mask >> bit & 1))
+    return tuple(table)
+
+
+def window_score_table(win_score, three_score, two_score, connect=4):
+    """
+    Score of a window for side 0, indexed by its code (own * (connect + 1)
+    + opp). Same rules as MiniMaxAI._evaluate_window, where "three" and
+    "two" are one and two pieces short of `connect`.
+    """
+    n = connect
+    table = []
+    for own in range(n + 1):
+        for opp in range(n + 1):
+            empty = n - own - opp
+            score = 0
+            if empty >= 0:
+                if own == n:
+                    score += win_score
+                elif own == n - 1 and empty == 1:
+                    score += three_score
+                elif own == n - 2 and empty == 2:
+                    score += two_score
+
+                if opp == n - 1 and empty == 1:
+                    score -= three_score
+                elif opp == n:
+                    score -= win_score
+            table.append(score)
+    return table
+
+
+class IncrementalEvaluator:
+    """
+    Keeps the heuristic score of a Position (from side 0's point of view)
+    up to date as moves are made and taken back.
+
+    Each move only touches the (at most 4 * connect) windows through the
+    new cell, so leaf evaluation in the search is a read of `score`. Use
+    make_move / unmake_move instead of the Position's own methods to keep
+    both in sync.
+    """
+
+    __slots__ = ('codes', 'score', '_cell_windows', '_deltas', '_steps')
+
+    def __init__(self, position, win_score=1000, three_score=100, two_score=10):
+        connect = position.connect
+        table = window_score_table(win_score, three_score, two_score, connect)
+        self._steps = side_steps(connect)
+        # Change in score when side 0 / side 1 adds a piece to a window
+        self._deltas = tuple(
+            [table[code + step] - table[code] if code + step < len(table) else 0
+             for code in range(len(table))]
+            for step in self._steps)
+        self._cell_windows = cell_windows(position.rows, position.cols, connect)
+
+        self.codes = [0] * len(window_masks(position.rows, position.cols, connect))
+        self.score = len(self.codes) * table[0]
+
+        for col in range(position.cols):
+            for height in range(position.heights[col]):
+                bit = col * position.height + height
+                side = 0 if position.masks[0] >> bit & 1 else 1
+                self._add(bit, side)
+
+    def _add(self, bit, side):
+        codes = self.codes
+        delta = self._deltas[side]
+        step = self._steps[side]
+        score = self.score
+        for window in self._cell_windows[bit]:
+            code = codes[window]
+            score += delta[code]
+            codes[window] = code + step
+        self.score = score
+
+    def _remove(self, bit, side):
+        codes = self.codes
+        delta = self._deltas[side]
+        step = self._steps[side]
+        score = self.score
+        for window in self._cell_windows[bit]:
+            code = codes[window] - step
+            codes[window] = code
+            score -= delta[code]
+        self.score = score
+
+    def make_move(self, position, col):
+        self._add(col * position.height + position.heights[col], position.to_move)
+        position.make_move(col)
+
+    def unmake_move(self, position, col):
+        position.unmake_move(col)
+        self._remove(col * position.height + position.heights[col], position.to_move)
@@ -0,0 +1,139 @@
+import argparse
+import asyncio
+import json
+import random
+from time import perf_counter
+
+from game_server import GameServer, latency_summary
+
+
+class Player:
+    """
+    One simulated client: a connection that plays `games` games in a row,
+    picking random legal columns and retrying moves the server refuses as
+    busy.
+    """
+
+    def __init__(self, host, port, difficulty, games, time_budget_ms, seed):
+        self.host = host
+        self.port = port
+        self.difficulty = difficulty
+        self.games = games
+        self.time_budget_ms = time_budget_ms
+        self.rng = random.Random(seed)
+        self.latencies = []
+        self.busy = 0
+        self.errors = 0
+        self.finished = 0
+
+    async def _request(self, reader, writer, message):
+        writer.write(json.dumps(message).encode() + b'\n')
+        await writer.drain()
+        return json.loads(await reader.readline())
+
+    async def run(self):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            for number in range(self.games):
+                while True:
+                    reply = await self._request(reader, writer, {
+                        'op': 'new', 'difficulty': self.difficulty, 'ai_first': number % 2 == 1,
+                        'time_budget_ms': self.time_budget_ms})
+                    if reply['ok'] or reply['error'] != 'busy':
+                        break
+                    self.busy += 1
+                    await asyncio.sleep(0.05)
+                if not reply['ok']:
+                    self.errors += 1
+                    continue
+                game_id = reply['game']
+
+                while reply.get('winner') is None and not reply.get('draw'):
+                    board = reply['board']
+                    col = self.rng.choice([col for col in range(len(board[0])) if board[0][col] == 0])
+                    start = perf_counter()
+                    result = await self._request(reader, writer, {
+                        'op': 'move', 'game': game_id, 'col': col,
+                        'time_budget_ms': self.time_budget_ms})
+                    if result['ok']:
+                        self.latencies.append((perf_counter() - start) * 1000)
+                        reply = result
+                    elif result['error'] == 'busy':
+                        self.busy += 1
+                        await asyncio.sleep(0.05)
+                    else:
+                        self.errors += 1
+                        break
+
+                self.finished += 1
+                await self._request(reader, writer, {'op': 'close', 'game': game_id})
+        finally:
+            writer.close()
+            await writer.wait_closed()
+
+
+async def fetch_metrics(host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(b'{"op": "metrics"}\n')
+    await writer.drain()
+    reply = json.loads(await reader.readline())
+    writer.close()
+    await writer.wait_closed()
+    return reply['metrics']
+
+
+async def load_test(host, port, players=200, games=2, difficulty='easy', time_budget_ms=None, seed=0):
+    clients = [Player(host, port, difficulty, games, time_budget_ms, seed * 100003 + number)
+               for number in range(players)]
+    start = perf_counter()
+    await asyncio.gather(*(client.run() for client in clients))
+    elapsed = perf_counter() - start
+
+    latencies = [ms for client in clients for ms in client.latencies]
+    return {
+        'players': players,
+        'games_finished': sum(client.finished for client in clients),
+        'moves': len(latencies),
+        'wall_time_s': round(elapsed, 3),
+        'moves_per_s': round(len(latencies) / elapsed, 1),
+        'busy_retries': sum(client.busy for client in clients),
+        'errors': sum(client.errors for client in clients),
+        'move_latency_ms': latency_summary(latencies),
+        'server': await fetch_metrics(host, port),
+    }
+
+
+async def _main(args):
+    server = None
+    if args.spawn:
+        # Run the server in this process, on its own event loop task
+        server = GameServer(args.workers, args.max_queue)
+        listener = await server.start(args.host, args.port)
+    try:
+        report = await load_test(args.host, args.port, args.players, args.games,
+                                 args.difficulty, args.time_budget_ms, args.seed)
+    finally:
+        if server is not None:
+            # Let the handlers see the clients hang up before stopping
+            while server.connections:
+                await asyncio.sleep(0.01)
+            listener.close()
+            await listener.wait_closed()
+            server.close()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test a Connect 4 game server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--players', type=int, default=200, help="concurrent connections")
+    parser.add_argument('--games', type=int, default=2, help="games per player")
+    parser.add_argument('--difficulty', default='easy')
+    parser.add_argument('--time-budget-ms', type=float, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--spawn', action='store_true', help="start a server in this process first")
+    parser.add_argument('--workers', type=int, default=None, help="with --spawn: AI processes")
+    parser.add_argument('--max-queue', type=int, default=None, help="with --spawn: server queue bound")
+    args = parser.parse_args()
+    asyncio.run(_main(args))
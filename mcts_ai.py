@@ -0,0 +1,315 @@
+import math
+import random
+from time import perf_counter
+
+from bitboard import Position, center_order, has_line, line_shifts, shape_masks, winning_cells
+from minimax_ai import DIFFICULTIES
+from search_stats import SearchStats
+
+# Iterations between two clock / stop event checks
+CHECK_INTERVAL = 16
+
+
+class _Node:
+    __slots__ = ('move', 'parent', 'children', 'untried', 'visits', 'wins', 'result')
+
+    def __init__(self, move, parent, untried, result=None):
+        self.move = move         # Column played to reach this node
+        self.parent = parent
+        self.children = []
+        self.untried = untried   # Columns not expanded yet, next one last
+        self.visits = 0
+        self.wins = 0.0          # For the side that played `move`
+        self.result = result     # 1.0 / 0.5 for that side if the game ended here
+
+
+class MCTSAI:
+    """
+    Monte Carlo Tree Search player with the same find_best_move interface
+    as MiniMaxAI.
+
+    UCT selection over a tree of (side to move pieces, occupied cells)
+    bitboard states, and playouts that take an immediate win, block the
+    opponent's immediate win and otherwise move at random (`guided=False`
+    plays purely random moves). The tree is kept between calls: when the
+    next position is the old root, or one or two plies below it, that
+    subtree becomes the new root along with all its statistics.
+    """
+
+    ENGINE = 'mcts'
+
+    def __init__(self, player_piece, time_budget_ms=500, playouts=None, exploration=1.4,
+                 guided=True, seed=None):
+        """
+        A search runs until `time_budget_ms` or `playouts` runs out,
+        whichever comes first (at least one must be set).
+        """
+        self.player_piece = player_piece
+        self.time_budget_ms = time_budget_ms
+        self.playouts = playouts
+        self.exploration = exploration
+        self.guided = guided
+        self.rng = random.Random(seed)
+        if self.player_piece == '\033[31m o \033[0m':
+            self.opponent_piece = '\033[34m o \033[0m'
+        else:
+            self.opponent_piece = '\033[31m o \033[0m'
+
+        self._root = None
+        self._root_state = None # (current, mask) at the root
+        self._shape = None
+        self.stats = SearchStats()
+        self.hooks = [] # hook(event, ai, stats) with 'start' / 'end', as for MiniMaxAI
+
+    @classmethod
+    def from_difficulty(cls, player_piece, difficulty='medium'):
+        return cls(player_piece, time_budget_ms=DIFFICULTIES[difficulty]['time_budget_ms'])
+
+    def reset(self):
+        self._root = None
+        self._root_state = None
+
+    def close(self):
+        pass
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook):
+        self.hooks.remove(hook)
+
+    def _emit(self, event):
+        for hook in self.hooks:
+            hook(event, self, self.stats)
+
+    # --- Tree ---
+    def _setup(self, rows, cols, connect):
+        if self._shape != (rows, cols, connect):
+            self.reset()
+            self._shape = (rows, cols, connect)
+            self.height = rows + 1
+            self.connect = connect
+            self.lines = line_shifts(rows + 1, connect)
+            self.bottom, self.board, self.columns = shape_masks(rows, cols)
+            # Popped from the end, so the center is expanded first
+            self.expand_order = center_order(cols)[::-1]
+
+    def _untried(self, current, mask):
+        """
+        Columns worth expanding for the side to move: a winning move if
+        there is one, else the blocks of the opponent's immediate wins,
+        else every playable column.
+        """
+        possible = (mask + self.bottom) & self.board
+        if self.guided:
+            shape = (self.height, self.board, self.connect)
+            wins = winning_cells(current, mask, *shape) & possible
+            if not wins:
+                wins = winning_cells(current ^ mask, mask, *shape) & possible
+            if wins:
+                possible = wins
+        return [col for col in self.expand_order if possible & self.columns[col]]
+
+    def _new_node(self, move, parent, current, mask):
+        # (current, mask) is the state after `move`, from the new side to move
+        if has_line(current ^ mask, self.lines):
+            return _Node(move, parent, [], 1.0)
+        if mask == self.board:
+            return _Node(move, parent, [], 0.5)
+        return _Node(move, parent, self._untried(current, mask))
+
+    def _play(self, current, mask, col):
+        return current ^ mask, mask | ((mask + self.bottom) & self.columns[col])
+
+    def _reuse(self, current, mask):
+        """
+        The node of the old tree for state (current, mask), found at the
+        old root or up to two plies below it, or None.
+        """
+        if self._root is None:
+            return None
+        if self._root_state == (current, mask):
+            return self._root
+        root_current, root_mask = self._root_state
+        for child in self._root.children:
+            child_current, child_mask = self._play(root_current, root_mask, child.move)
+            if (child_current, child_mask) == (current, mask):
+                return child
+            for grandchild in child.children:
+                if self._play(child_current, child_mask, grandchild.move) == (current, mask):
+                    return grandchild
+        return None
+
+    # --- Playouts ---
+    def _rollout(self, current, mask):
+        """
+        Plays the game out from (current, mask). Returns 1.0 if the side
+        to move there wins, 0.0 if it loses and 0.5 for a draw.
+        """
+        height, bottom, board, columns = self.height, self.bottom, self.board, self.columns
+        connect, lines = self.connect, self.lines
+        choice = self.rng.choice
+        guided = self.guided
+        turn = 0
+        while True:
+            possible = (mask + bottom) & board
+            if not possible:
+                return 0.5
+            opponent = current ^ mask
+            if guided:
+                if winning_cells(current, mask, height, board, connect) & possible:
+                    return 1.0 - turn
+                threats = winning_cells(opponent, mask, height, board, connect) & possible
+                if threats:
+                    move = threats & -threats
+                else:
+                    move = choice([possible & column for column in columns if possible & column])
+            else:
+                move = choice([possible & column for column in columns if possible & column])
+                if has_line(current | move, lines):
+                    return 1.0 - turn
+            current, mask = opponent, mask | move
+            turn ^= 1
+
+    def _iterate(self, root, current, mask):
+        # One select / expand / playout / backpropagate pass
+        node = root
+        exploration = self.exploration
+        while node.result is None and not node.untried and node.children:
+            log_visits = math.log(node.visits)
+            best, best_value = None, -1.0
+            for child in node.children:
+                value = child.wins / child.visits + exploration * math.sqrt(log_visits / child.visits)
+                if value > best_value:
+                    best, best_value = child, value
+            node = best
+            current, mask = self._play(current, mask, node.move)
+
+        if node.result is None and node.untried:
+            col = node.untried.pop()
+            current, mask = self._play(current, mask, col)
+            child = self._new_node(col, node, current, mask)
+            node.children.append(child)
+            node = child
+
+        if node.result is not None:
+            result = node.result
+        else:
+            result = 1.0 - self._rollout(current, mask)
+
+        while node is not None:
+            node.visits += 1
+            node.wins += result
+            result = 1.0 - result
+            node = node.parent
+
+    def _principal_variation(self, node):
+        line = []
+        while node.children:
+            node = max(node.children, key=lambda child: child.visits)
+            line.append(node.move)
+        return line
+
+    # --- Search ---
+    def search_position(self, position, time_budget_ms=None, playouts=None, stop_event=None):
+        """
+        Searches a bitboard Position for its side to move. Returns
+        (column, win rate of that column); stats go to self.stats, with
+        `nodes` counting this search's playouts.
+        """
+        if time_budget_ms is None:
+            time_budget_ms = self.time_budget_ms
+        if playouts is None:
+            playouts = self.playouts
+        self._setup(position.rows, position.cols, position.connect)
+        current = position.masks[position.to_move]
+        mask = position.masks[0] | position.masks[1]
+
+        self.stats = stats = SearchStats()
+        stats.source = 'mcts'
+        start = perf_counter()
+        self._emit('start')
+
+        root = self._reuse(current, mask)
+        if root is None:
+            root = _Node(None, None, self._untried(current, mask))
+        root.parent = None
+        stats.reused = root.visits
+        self._root, self._root_state = root, (current, mask)
+
+        deadline = None if time_budget_ms is None else start + time_budget_ms / 1000
+        limit = playouts if playouts is not None else float('inf')
+        count = 0
+        if root.untried or root.children:
+            while count < limit:
+                self._iterate(root, current, mask)
+                count += 1
+                if count % CHECK_INTERVAL == 0:
+                    if deadline is not None and perf_counter() >= deadline:
+                        break
+                    if stop_event is not None and stop_event.is_set():
+                        stats.aborted = True
+                        break
+
+        col, score = None, None
+        if root.children:
+            best = max(root.children, key=lambda child: child.visits)
+            col, score = best.move, round(best.wins / best.visits, 3)
+        stats.move, stats.score = col, score
+        stats.nodes = count
+        stats.pv = self._principal_variation(root)
+        stats.elapsed_ms = (perf_counter() - start) * 1000
+        self._emit('end')
+        return col, score
+
+    def _position_of(self, board, to_move_piece=None):
+        # See MiniMaxAI._position_of
+        if isinstance(board, list):
+            if to_move_piece in (None, self.player_piece):
+                return Position.from_board(board, self.player_piece, self.opponent_piece)
+            if to_move_piece == self.opponent_piece:
+                return Position.from_board(board, self.opponent_piece, self.player_piece)
+            raise ValueError(f"to_move_piece {to_move_piece!r} is neither player's piece")
+        return board.to_position()
+
+    def find_best_move(self, board, time_budget_ms=None, node_budget=None, stop_event=None):
+        """
+        Returns the column to play. `board` is a Connect4 game in which the
+        AI is the current player, or a list-of-lists board of piece strings.
+        `node_budget` caps the playouts of this call.
+        """
+        col, _ = self.search_position(self._position_of(board), time_budget_ms, node_budget,
+                                      stop_event)
+        return col
+
+    def analyse(self, board, time_budget_ms=None, node_budget=None, stop_event=None,
+                to_move_piece=None):
+        """
+        Same result as MiniMaxAI.analyse, with each expanded column's win
+        rate as its score. The tree carries over, so every call refines the
+        last one; it is never 'complete'.
+        """
+        position = self._position_of(board, to_move_piece)
+        best, _ = self.search_position(position, time_budget_ms, node_budget, stop_event)
+        scores = {child.move: round(child.wins / child.visits, 3) for child in self._root.children}
+        return {'best': best, 'scores': scores, 'depth': len(self.stats.pv), 'complete': False}
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    from tournament import run_tournament
+
+    parser = argparse.ArgumentParser(description="MCTSAI against MiniMaxAI at equal time per move")
+    parser.add_argument('--time-budget-ms', type=float, default=300)
+    parser.add_argument('--games', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--unguided', action='store_true', help="purely random playouts")
+    args = parser.parse_args()
+
+    mcts = {'engine': 'mcts', 'time_budget_ms': args.time_budget_ms, 'guided': not args.unguided}
+    minimax = {'level': 42, 'time_budget_ms': args.time_budget_ms}
+    report = run_tournament(mcts, minimax, args.games, args.workers, seed=args.seed)
+    print(json.dumps(report, indent=2))
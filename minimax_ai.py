@@ -1,10 +1,74 @@
-from random import choice
+from time import perf_counter
+
+from bitboard import Position, center_order, window_masks
+from endgame_solver import EndgameSolver, SolverAborted
+from incremental_eval import IncrementalEvaluator
+from search_stats import SearchStats
+from transposition import EXACT, LOWER, UPPER, TranspositionTable
+
+# Difficulty presets: `level` is the maximum depth, the budgets cap how long
+# a single move may take so latency stays predictable in the GUI.
+DIFFICULTIES = {
+    'easy':   {'level': 2,  'time_budget_ms': 100,  'node_budget': 2000},
+    'medium': {'level': 6,  'time_budget_ms': 300,  'node_budget': 50000},
+    'hard':   {'level': 12, 'time_budget_ms': 800,  'node_budget': None},
+    'expert': {'level': 42, 'time_budget_ms': 2000, 'node_budget': None},
+}
+
+# How many nodes to search between two clock reads
+CHECK_INTERVAL = 1024
+# Positions whose per-column analysis is kept for later refinement
+ANALYSIS_CACHE_SIZE = 1024
+
+
+class _SearchAborted(Exception):
+    """Raised inside _minimax when the time or node budget runs out."""
+
 
 class MiniMaxAI:
 
-    def __init__(self, player_piece, level=4):
+    ENGINE = 'minimax'
+
+    def __init__(self, player_piece, level=4, time_budget_ms=None, node_budget=None,
+                 tt_buckets=1 << 16, move_ordering=True, workers=1, book=None,
+                 solver_threshold=18, solver_node_limit=300000, connect=4, symmetry=True):
+        """
+        With no budget, find_best_move runs a fixed depth `level` search.
+        With a time (milliseconds) and/or node budget it deepens iteratively
+        up to `level` and returns the best move of the last completed depth.
+        `move_ordering=False` searches columns left to right (for comparing
+        node counts). `workers > 1` splits the root moves over a persistent
+        process pool (see parallel_search.py); call close() when done.
+        `book` is an OpeningBook or the path of one built by opening_book.py.
+        Positions with at most `solver_threshold` empty cells are solved
+        exactly by the EndgameSolver, unless it needs more than
+        `solver_node_limit` nodes or runs out of time (then the normal
+        search runs with what is left of the budget).
+        `connect` is the line length that wins on list-of-lists boards;
+        Connect4 games and Positions carry their own.
+        With `symmetry` a position and its left-right mirror share their
+        TT and analysis entries, and symmetric positions only search the
+        columns up to the middle (False is for comparing node counts).
+        """
         self.player_piece = player_piece
         self.level = level
+        self.time_budget_ms = time_budget_ms
+        self.node_budget = node_budget
+        self.connect = connect
+        self.move_ordering = move_ordering
+        self.symmetry = symmetry
+        self.tt_buckets = tt_buckets
+        self.workers = workers
+        self._parallel = None
+        self._game_id = 0
+        if isinstance(book, str):
+            from opening_book import OpeningBook
+            book = OpeningBook(book)
+        self.book = book
+        self.solver_threshold = solver_threshold
+        self.solver = EndgameSolver(tt_buckets, solver_node_limit)
+        # Kept across find_best_move calls; call reset() for a new game
+        self.tt = TranspositionTable(tt_buckets)
         if self.player_piece == '\033[31m o \033[0m':
             self.opponent_piece = '\033[34m o \033[0m'
         else:
@@ -14,6 +78,63 @@ class MiniMaxAI:
         self.THREE_IN_A_ROW_SCORE = 100
         self.TWO_IN_A_ROW_SCORE = 10
 
+        # Move ordering tables, indexed by absolute ply (pieces on the board)
+        # and by side/cell respectively. Like the TT they last for a game.
+        self._killers = {}
+        self._history = [{}, {}]
+        # position.key() -> (depth, {column: score}) of past analyses
+        self._analysis = {}
+
+        # Search bookkeeping. The hot counters live on the AI while a search
+        # runs and are copied into a SearchStats when it ends.
+        self._evaluator = None
+        self.nodes = 0
+        self.leaf_evals = 0
+        self.cutoffs_by_index = []
+        self.stats = SearchStats()
+        # Called as hook(event, ai, stats) with event 'start', 'depth' (after
+        # each completed iteration) or 'end'. They run on the searching
+        # thread, so GUI hooks should only store what they are given.
+        self.hooks = []
+        self._stop_event = None
+        self._deadline = None
+        self._node_limit = None
+        self._check_at = float('inf')
+
+    @classmethod
+    def from_difficulty(cls, player_piece, difficulty='medium'):
+        return cls(player_piece, **DIFFICULTIES[difficulty])
+
+    def reset(self):
+        """
+        Forgets everything learned during the current game.
+        """
+        self.tt.clear()
+        self.solver.reset()
+        self._killers = {}
+        self._history = [{}, {}]
+        self._analysis = {}
+        # Tells the parallel workers to drop their tables too
+        self._game_id += 1
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook):
+        self.hooks.remove(hook)
+
+    def _emit(self, event):
+        for hook in self.hooks:
+            hook(event, self, self.stats)
+
+    def close(self):
+        """
+        Shuts down the parallel search worker pool, if one was started.
+        """
+        if self._parallel is not None:
+            self._parallel.close()
+            self._parallel = None
+
     def get_valid_moves(self, board):
         valid_cols = []
         for col in range(len(board[0])):
@@ -30,25 +151,26 @@ class MiniMaxAI:
         return None
 
     def _is_winner(self, board, piece):
+        n = self.connect
         # Horizontal Win
         for row in range(len(board)):
-            for col in range(len(board[0]) - 3):
-                if all(board[row][col+i] == piece for i in range(4)):
+            for col in range(len(board[0]) - n + 1):
+                if all(board[row][col+i] == piece for i in range(n)):
                     return True
         # Vertical Win
         for col in range(len(board[0])):
-            for row in range(len(board) - 3):
-                if all(board[row+i][col] == piece for i in range(4)):
+            for row in range(len(board) - n + 1):
+                if all(board[row+i][col] == piece for i in range(n)):
                     return True
         # Diagonal (/) Win
-        for col in range(len(board[0]) - 3):
-            for row in range(len(board) - 1, 2, -1):
-                if all(board[row-i][col+i] == piece for i in range(4)):
+        for col in range(len(board[0]) - n + 1):
+            for row in range(len(board) - 1, n - 2, -1):
+                if all(board[row-i][col+i] == piece for i in range(n)):
                     return True
         # Diagonal (\) Win
-        for col in range(len(board[0]) - 3):
-            for row in range(len(board) - 3):
-                if all(board[row+i][col+i] == piece for i in range(4)):
+        for col in range(len(board[0]) - n + 1):
+            for row in range(len(board) - n + 1):
+                if all(board[row+i][col+i] == piece for i in range(n)):
                     return True
         return False
 
@@ -67,6 +189,8 @@ class MiniMaxAI:
             return None
         
     def _evaluate_window(self, window, piece):
+        # "Three" and "two" mean one and two pieces short of a line
+        n = self.connect
         score = 0
 
         if piece == self.player_piece:
@@ -74,75 +198,186 @@ class MiniMaxAI:
         else:
             opp_piece = self.player_piece
     
-        if window.count(piece) == 4:
+        if window.count(piece) == n:
             score += self.WIN_SCORE
 
-        elif window.count(piece) == 3 and window.count('   ') == 1 :
+        elif window.count(piece) == n - 1 and window.count('   ') == 1 :
             score += self.THREE_IN_A_ROW_SCORE
 
-        elif window.count(piece) == 2 and window.count('   ') == 2 :
+        elif window.count(piece) == n - 2 and window.count('   ') == 2 :
             score += self.TWO_IN_A_ROW_SCORE
 
-        if  window.count(opp_piece) == 3 and window.count('   ') == 1 :
+        if  window.count(opp_piece) == n - 1 and window.count('   ') == 1 :
             score -= self.THREE_IN_A_ROW_SCORE   
 
-        elif window.count(opp_piece) == 4:
+        elif window.count(opp_piece) == n:
             score -= self.WIN_SCORE 
         
         return score
 
 
     def _heuristic_score(self, board, piece):
+        n = self.connect
         score = 0
 
         # Horizontal Window
         for row in range(len(board)):
-            for col in range(len(board[0]) - 3):
-                window = [board[row][col+i] for i in range(4)]
+            for col in range(len(board[0]) - n + 1):
+                window = [board[row][col+i] for i in range(n)]
                 score += self._evaluate_window(window, piece)
         
         # Vertical Window
         for col in range(len(board[0])):
-            for row in range(len(board) - 3):
-                window = [board[row + i][col] for i in range(4)]
+            for row in range(len(board) - n + 1):
+                window = [board[row + i][col] for i in range(n)]
                 score += self._evaluate_window(window, piece)
 
         # Diagonal (/) Window
-        for col in range(len(board[0]) - 3):
-            for row in range(len(board) - 1, 2, -1):      
-                window = [board[row-i][col+i] for i in range(4)]
+        for col in range(len(board[0]) - n + 1):
+            for row in range(len(board) - 1, n - 2, -1):      
+                window = [board[row-i][col+i] for i in range(n)]
                 score += self._evaluate_window(window, piece)
 
         # Diagonal (\) Window
-        for col in range(len(board[0]) - 3):
-            for row in range(len(board) - 3):
-                window = [board[row+i][col+i] for i in range(4)]
+        for col in range(len(board[0]) - n + 1):
+            for row in range(len(board) - n + 1):
+                window = [board[row+i][col+i] for i in range(n)]
                 score += self._evaluate_window(window, piece)
 
         return score
 
 
-    def _minimax(self, board, depth, maximizing_player, alpha, beta):
+    # --- Bitboard Search ---
+    # The search runs on a bitboard Position where side 0 is always this AI
+    # (it is converted at find_best_move entry, when it is the AI's turn).
+    def _score_position(self, position):
+        # Only the side that just moved can have completed a line
+        if position.last_move_won():
+            return 1000000 if position.to_move == 1 else -1000000
+        elif position.is_full():
+            return 0
+        else:
+            # This is a non-terminal state
+            return None
+
+    def _heuristic_position(self, position):
+        """
+        Same scoring as _heuristic_score(board, self.player_piece), computed
+        from per-window piece counts on the bitboards. The search reads the
+        incrementally maintained self._evaluator.score instead; this full
+        recount is kept as its reference.
+        """
+        mine, theirs = position.masks
+        n = position.connect
+        score = 0
+
+        for window in window_masks(position.rows, position.cols, n):
+            own = (mine & window).bit_count()
+            opp = (theirs & window).bit_count()
+            empty = n - own - opp
+
+            if own == n:
+                score += self.WIN_SCORE
+            elif own == n - 1 and empty == 1:
+                score += self.THREE_IN_A_ROW_SCORE
+            elif own == n - 2 and empty == 2:
+                score += self.TWO_IN_A_ROW_SCORE
+
+            if opp == n - 1 and empty == 1:
+                score -= self.THREE_IN_A_ROW_SCORE
+            elif opp == n:
+                score -= self.WIN_SCORE
+
+        return score
+
+    def _store(self, key, depth, score, move, alpha, beta):
+        # Scores are always from the AI's point of view, so the bound type
+        # only depends on where the score fell relative to the search window
+        if score <= alpha:
+            flag = UPPER
+        elif score >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.tt.store(key, depth, flag, score, move)
+
+    def _set_budget(self, deadline, node_limit):
+        # `deadline` is a perf_counter() time, `node_limit` a node count
+        self._deadline = deadline
+        self._node_limit = node_limit
+        self._check_at = self.nodes
+
+    def _clear_budget(self):
+        self._deadline = None
+        self._node_limit = None
+        self._check_at = float('inf')
+
+    def _check_budget(self):
+        if self._stop_event is not None and self._stop_event.is_set():
+            raise _SearchAborted
+        if self._node_limit is not None and self.nodes >= self._node_limit:
+            raise _SearchAborted
+        if self._deadline is not None and perf_counter() >= self._deadline:
+            raise _SearchAborted
+        self._check_at = self.nodes + CHECK_INTERVAL
+        if self._node_limit is not None:
+            self._check_at = min(self._check_at, self._node_limit)
+
+    def _minimax(self, position, depth, maximizing_player, alpha, beta, first_move=None):
+        self.nodes += 1
+        if self.nodes >= self._check_at:
+            self._check_budget()
+
         # --- Base Cases ---
-        score = self._score_board(board)
+        score = self._score_position(position)
         if score is not None: # If board is not in an end state 
             return (None, score)      
         if depth == 0:        # Check if we've reached the maximum depth
-            return (None, self._heuristic_score(board, self.player_piece))
+            self.leaf_evals += 1
+            return (None, self._evaluator.score)
+
+        # --- Transposition Table ---
+        # A position and its mirror share the entry of the smaller key,
+        # with the move stored as seen from that side
+        key = position.key()
+        symmetric = mirrored = False
+        if self.symmetry:
+            mirror = position.mirror_key()
+            symmetric = mirror == key
+            if mirror < key:
+                key, mirrored = mirror, True
+        alpha_orig, beta_orig = alpha, beta
+        entry = self.tt.probe(key)
+        tt_move = None
+        if entry is not None:
+            tt_move = entry[4]
+            if mirrored and tt_move is not None:
+                tt_move = position.cols - 1 - tt_move
+        if entry is not None and entry[1] >= depth:
+            flag, tt_score = entry[2], entry[3]
+            if flag == EXACT:
+                return tt_move, tt_score
+            elif flag == LOWER:
+                alpha = max(alpha, tt_score)
+            else:
+                beta = min(beta, tt_score)
+            if alpha >= beta:
+                return tt_move, tt_score
         
         
         # --- Recursive Step ---
         #--------   AI   --------
         if maximizing_player:
             max_eval = -float('inf')
-            valid_moves = self.get_valid_moves(board)
-            best_move = choice(valid_moves) # Start with a random column
+            valid_moves = self._order_moves(position, tt_move if first_move is None else first_move,
+                                            symmetric)
+            best_move = valid_moves[0]
 
-            for move in valid_moves:
-                #Updated board after a simul. move
-                temp_board = self._simulate_move(board, move, self.player_piece)
-
-                evaluation = self._minimax(temp_board, depth-1, not maximizing_player, alpha, beta)[1]
+            for index, move in enumerate(valid_moves):
+                # Simulate the move in place, search, then take it back
+                self._evaluator.make_move(position, move)
+                evaluation = self._minimax(position, depth-1, not maximizing_player, alpha, beta)[1]
+                self._evaluator.unmake_move(position, move)
 
                 if evaluation > max_eval:
                     max_eval = evaluation
@@ -151,21 +386,25 @@ class MiniMaxAI:
                 alpha = max(max_eval, alpha)
 
                 if alpha >= beta:
+                    self._record_cutoff(position, move, depth, index)
                     break
-            
+
+            self._store(key, depth, max_eval, position.cols - 1 - best_move if mirrored else best_move,
+                        alpha_orig, beta_orig)
             return best_move, max_eval
 
         #-------- PLAYER --------        
         else:
             min_eval = float('inf')
-            valid_moves = self.get_valid_moves(board)
-            best_move = choice(valid_moves) # Start with a random column
+            valid_moves = self._order_moves(position, tt_move if first_move is None else first_move,
+                                            symmetric)
+            best_move = valid_moves[0]
 
-            for move in valid_moves:
-                #Updated board after a simul. move
-                temp_board = self._simulate_move(board, move, self.opponent_piece)
-                
-                evaluation = self._minimax(temp_board, depth-1, not maximizing_player, alpha, beta)[1]
+            for index, move in enumerate(valid_moves):
+                # Simulate the move in place, search, then take it back
+                self._evaluator.make_move(position, move)
+                evaluation = self._minimax(position, depth-1, not maximizing_player, alpha, beta)[1]
+                self._evaluator.unmake_move(position, move)
 
                 if evaluation < min_eval:
                     min_eval = evaluation
@@ -174,12 +413,428 @@ class MiniMaxAI:
                 beta = min(min_eval, beta)
 
                 if alpha >= beta:
+                    self._record_cutoff(position, move, depth, index)
                     break
-            
+
+            self._store(key, depth, min_eval, position.cols - 1 - best_move if mirrored else best_move,
+                        alpha_orig, beta_orig)
             return best_move, min_eval
 
-    def find_best_move(self, board):
-        best_col, minimax_score = self._minimax(board, self.level, True, -float('inf'), float('inf'))
+    def _order_moves(self, position, first_move, symmetric=False):
+        """
+        Returns the legal columns in search order: immediate wins, forced
+        blocks, `first_move` (TT / previous iteration best), killer moves for
+        this ply, then the rest by history score and center-out order.
+        A `symmetric` position only gets the columns up to the middle; the
+        others lead to the mirrors of the same positions.
+        """
+        last = (position.cols - 1) // 2 if symmetric else position.cols - 1
+        if not self.move_ordering:
+            moves = [col for col in position.valid_moves() if col <= last]
+            if first_move in moves:
+                moves.remove(first_move)
+                moves.insert(0, first_move)
+            return moves
+
+        side = position.to_move
+        killers = self._killers.get(position.moves, ())
+        history = self._history[side]
+        height = position.height
+        heights = position.heights
+
+        ranked = []
+        for order, col in enumerate(center_order(position.cols)):
+            if heights[col] == position.rows or col > last:
+                continue
+            if position.is_winning_move(col, side):
+                return [col] # Nothing can beat an immediate win
+            if position.is_winning_move(col, side ^ 1):
+                rank = 4
+            elif col == first_move:
+                rank = 3
+            elif col in killers:
+                rank = 2
+            else:
+                rank = 1
+            ranked.append((rank, history.get(col * height + heights[col], 0), -order, col))
+
+        ranked.sort(reverse=True)
+        return [entry[3] for entry in ranked]
+
+    def _record_cutoff(self, position, move, depth, index):
+        self.cutoffs_by_index[index] += 1
+        if not self.move_ordering:
+            return
+
+        killers = self._killers.setdefault(position.moves, [None, None])
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+
+        history = self._history[position.to_move]
+        cell = move * position.height + position.heights[move]
+        history[cell] = history.get(cell, 0) + depth * depth
+
+    def search_stats(self):
+        """
+        The last search's SearchStats as a dict, plus the TT counters for
+        the whole game under 'tt'.
+        """
+        stats = self.stats.as_dict()
+        stats['tt'] = self.tt.stats()
+        return stats
+
+    def _principal_variation(self, position, move, depth):
+        # Follows the TT's best moves from the root; the line stops early
+        # where an entry was overwritten
+        line = []
+        position = position.copy()
+        while move is not None and len(line) < depth and position.can_play(move):
+            line.append(move)
+            position.make_move(move)
+            if self._score_position(position) is not None:
+                break
+            move = self._tt_move(position)
+        return line
+
+    def _tt_key(self, position):
+        # (key, mirrored) under which the TT and the analysis cache keep a
+        # position: the smaller of its key and its mirror's
+        key = position.key()
+        if self.symmetry:
+            mirror = position.mirror_key()
+            if mirror < key:
+                return mirror, True
+        return key, False
+
+    def _tt_move(self, position):
+        key, mirrored = self._tt_key(position)
+        entry = self.tt.probe(key)
+        if entry is None or entry[4] is None:
+            return None
+        return position.cols - 1 - entry[4] if mirrored else entry[4]
+
+    def _iterative_deepening(self, position, time_budget_ms, node_budget):
+        start = perf_counter()
+        deadline = None if time_budget_ms is None else start + time_budget_ms / 1000
+        max_depth = min(self.level, position.rows * position.cols - position.moves)
+
+        best_col, best_score = None, None
+        for depth in range(1, max_depth + 1):
+            # Depth 1 always completes so there is a move to return
+            if best_col is not None:
+                self._set_budget(deadline, node_budget)
+            depth_start, depth_nodes = perf_counter(), self.nodes
+            try:
+                move, score = self._root_search(position, depth, best_col)
+            except _SearchAborted:
+                # The position was left mid-search; it is not reused
+                self.stats.aborted = True
+                break
+
+            best_col, best_score = move, score
+            self._completed_depth(depth, move, score, depth_start, depth_nodes)
+            if abs(score) >= 1000000: # Proven win or loss, deeper won't change it
+                break
+
+        self._clear_budget()
+        return best_col, best_score
+
+    def _root_search(self, position, depth, first_move=None):
+        if self.workers > 1:
+            if self._parallel is None:
+                from parallel_search import RootParallelSearch
+                self._parallel = RootParallelSearch(self, self.workers)
+            return self._parallel.search(position, depth, first_move)
+        return self._minimax(position, depth, True, -float('inf'), float('inf'),
+                             first_move=first_move)
+
+    def search_position(self, position, time_budget_ms=None, node_budget=None, stop_event=None):
+        """
+        Searches a bitboard Position in which side 0 is this AI and is to
+        move. Returns (column, score); budgets default to the constructor's.
+        The position is left unchanged unless the search was cut short.
+        What the search did is left in self.stats (a SearchStats).
+
+        Setting `stop_event` (a threading.Event) from another thread stops
+        the search like an exhausted budget: a budgeted search returns its
+        last completed depth, a fixed-depth one returns (None, None).
+        """
+        self._stop_event = stop_event
+        if time_budget_ms is None:
+            time_budget_ms = self.time_budget_ms
+        if node_budget is None:
+            node_budget = self.node_budget
+
+        self.nodes = 0
+        self.leaf_evals = 0
+        self.cutoffs_by_index = [0] * position.cols
+        self.stats = stats = SearchStats()
+        tt_hits, tt_misses = self.tt.hits, self.tt.misses
+        empty = position.rows * position.cols - position.moves # Before an abort can move it
+        start = perf_counter()
+        self._emit('start')
+
+        col, score = self._search(position, time_budget_ms, node_budget)
+
+        stats.move, stats.score = col, score
+        stats.elapsed_ms = (perf_counter() - start) * 1000
+        stats.proven = self._is_proven(empty, stats, score)
+        if stats.source == 'search':
+            stats.nodes = self.nodes
+            stats.leaf_evals = self.leaf_evals
+            stats.cutoffs_by_index = self.cutoffs_by_index
+            stats.tt_hits = self.tt.hits - tt_hits
+            stats.tt_probes = stats.tt_hits + self.tt.misses - tt_misses
+            if col is not None and not stats.aborted:
+                if self._parallel is not None and self._parallel.pv[:1] == [col]:
+                    stats.pv = self._parallel.pv # Below the root it is in the workers' TTs
+                else:
+                    stats.pv = self._principal_variation(position, col, stats.depth)
+            elif col is not None:
+                stats.pv = [col] # The aborted depth may have moved the position
+        else:
+            stats.pv = [col]
+        self._emit('end')
+        return col, score
+
+    def _search(self, position, time_budget_ms, node_budget):
+        stats = self.stats
+        if self.book is not None and position.moves <= self.book.plies:
+            entry = self.book.lookup(position)
+            if entry is not None:
+                stats.source = 'book'
+                return entry
+
+        empty = position.rows * position.cols - position.moves
+        if empty <= self.solver_threshold:
+            start = perf_counter()
+            deadline = None if time_budget_ms is None else start + time_budget_ms / 1000
+            try:
+                col, exact = self.solver.best_move(position, deadline, self._stop_event)
+            except SolverAborted:
+                # The search gets what is left of the budget
+                if time_budget_ms is not None:
+                    time_budget_ms = max(0.0, (deadline - perf_counter()) * 1000)
+            else:
+                stats.source = 'solver'
+                stats.nodes = self.solver.nodes
+                stats.depths.append({'depth': empty, 'move': col, 'score': self._solver_score(exact),
+                                     'nodes': self.solver.nodes, 'ms': (perf_counter() - start) * 1000})
+                return col, self._solver_score(exact)
+
+        self._evaluator = IncrementalEvaluator(position, self.WIN_SCORE,
+                                               self.THREE_IN_A_ROW_SCORE, self.TWO_IN_A_ROW_SCORE)
+        self.tt.new_search()
+
+        if time_budget_ms is None and node_budget is None:
+            if self._stop_event is not None:
+                self._set_budget(None, None)
+            start = perf_counter()
+            try:
+                result = self._root_search(position, self.level)
+            except _SearchAborted:
+                result = (None, None)
+                stats.aborted = True
+            self._clear_budget()
+            if result[0] is not None:
+                self._completed_depth(self.level, result[0], result[1], start, 0)
+            return result
+
+        return self._iterative_deepening(position, time_budget_ms, node_budget)
+
+    def _is_proven(self, empty, stats, score):
+        # The solver is exact, and so is a search that saw a forced result
+        # or the end of every line (`empty` cells at the root)
+        if score is None:
+            return False
+        return stats.source == 'solver' or abs(score) >= 1000000 or \
+            (stats.source != 'book' and stats.depth >= empty)
+
+    def _completed_depth(self, depth, move, score, start, nodes_before):
+        self.stats.depths.append({
+            'depth': depth,
+            'move': move,
+            'score': score,
+            'nodes': self.nodes - nodes_before,
+            'ms': (perf_counter() - start) * 1000,
+        })
+        self._emit('depth')
+
+    def _solver_score(self, exact):
+        # Solver scores count moves to a win/loss; put them beyond the
+        # search's +-1000000 terminal scores so sooner wins rank higher
+        if exact > 0:
+            return 1000000 + exact
+        if exact < 0:
+            return -1000000 + exact
+        return 0
+
+    # --- Analysis ---
+    def _position_of(self, board, to_move_piece=None):
+        # Convert once; the whole search then runs on the bitboard. A list
+        # board does not say whose turn it is: `to_move_piece` (default
+        # this AI's piece) becomes side 0
+        if isinstance(board, list):
+            if to_move_piece in (None, self.player_piece):
+                return Position.from_board(board, self.player_piece, self.opponent_piece,
+                                           self.connect)
+            if to_move_piece == self.opponent_piece:
+                return Position.from_board(board, self.opponent_piece, self.player_piece,
+                                           self.connect)
+            raise ValueError(f"to_move_piece {to_move_piece!r} is neither player's piece")
+        return board.to_position()
+
+    def analyse(self, board, time_budget_ms=None, node_budget=None, stop_event=None,
+                to_move_piece=None):
+        """
+        Scores every legal column for the side to move in one search.
+        `board` is as for find_best_move, except that it may be either
+        player's turn: a Connect4 game knows whose turn it is, for a
+        list-of-lists board pass the piece to move as `to_move_piece`
+        (default this AI's). Returns {'best', 'scores', 'depth',
+        'complete'} (see analyse_position).
+        """
+        return self.analyse_position(self._position_of(board, to_move_piece), time_budget_ms,
+                                     node_budget, stop_event)
+
+    def analyse_position(self, position, time_budget_ms=None, node_budget=None, stop_event=None):
+        """
+        Searches every root move of `position` (side 0 to move) with a full
+        window, deepening iteratively within the budgets, and returns
+        {'best': column, 'scores': {column: score}, 'depth': depth,
+        'complete': no deeper analysis is possible} from side 0's point of
+        view; positions near the end are solved exactly.
+
+        Results are cached per position: analysing it again resumes one
+        depth past the cached result instead of starting over, so repeated
+        calls (e.g. once per frame of a hint display) keep refining it.
+        A position and its mirror share one cache entry, and a symmetric
+        position only searches the columns up to the middle.
+        """
+        if time_budget_ms is None:
+            time_budget_ms = self.time_budget_ms
+        if node_budget is None:
+            node_budget = self.node_budget
+        self._stop_event = stop_event
+        key, mirrored = self._tt_key(position)
+        symmetric = self.symmetry and position.mirror_key() == position.key()
+        position = position.copy() # An aborted depth leaves its copy mid-search
+        self.nodes = 0
+        self.leaf_evals = 0
+        self.cutoffs_by_index = [0] * position.cols
+        self.stats = stats = SearchStats()
+        stats.source = 'analysis'
+        start = perf_counter()
+        self._emit('start')
+
+        done, scores = self._analysis.get(key, (0, {}))
+        if mirrored:
+            scores = self._mirror_scores(scores, position.cols)
+        empty = position.rows * position.cols - position.moves
+        deadline = None if time_budget_ms is None else start + time_budget_ms / 1000
+        if not scores and empty <= self.solver_threshold:
+            done, scores = self._solve_columns(position, symmetric, deadline)
+
+        max_depth = min(self.level, empty)
+        if done < max_depth and not self._proven(scores):
+            self._evaluator = IncrementalEvaluator(position, self.WIN_SCORE,
+                                                   self.THREE_IN_A_ROW_SCORE, self.TWO_IN_A_ROW_SCORE)
+            self.tt.new_search()
+            for depth in range(done + 1, max_depth + 1):
+                # Only the stop event can cut the first depth short, so
+                # every column normally gets a score
+                if scores:
+                    self._set_budget(deadline, node_budget)
+                elif stop_event is not None:
+                    self._set_budget(None, None)
+                depth_start, depth_nodes = perf_counter(), self.nodes
+                try:
+                    new_scores = {}
+                    for col in self._order_moves_all(position, scores, symmetric):
+                        self._evaluator.make_move(position, col)
+                        new_scores[col] = self._minimax(position, depth - 1, False,
+                                                        -float('inf'), float('inf'))[1]
+                        self._evaluator.unmake_move(position, col)
+                except _SearchAborted:
+                    stats.aborted = True
+                    break
+                if symmetric:
+                    new_scores.update(self._mirror_scores(new_scores, position.cols))
+                done, scores = depth, new_scores
+                best = max(scores, key=scores.get)
+                self._completed_depth(depth, best, scores[best], depth_start, depth_nodes)
+                if self._proven(scores):
+                    break
+            self._clear_budget()
+
+        if scores:
+            self._analysis[key] = (done, self._mirror_scores(scores, position.cols) if mirrored else scores)
+            if len(self._analysis) > ANALYSIS_CACHE_SIZE:
+                del self._analysis[next(iter(self._analysis))] # Oldest first
+        best = max(scores, key=scores.get) if scores else None
+        stats.move, stats.score = best, scores.get(best)
+        stats.proven = self._proven(scores) or (bool(scores) and done >= empty)
+        stats.nodes = self.nodes
+        stats.leaf_evals = self.leaf_evals
+        stats.cutoffs_by_index = self.cutoffs_by_index
+        stats.pv = [best] if best is not None else []
+        stats.elapsed_ms = (perf_counter() - start) * 1000
+        self._emit('end')
+        return {'best': best, 'scores': dict(scores), 'depth': done,
+                'complete': done >= max_depth or self._proven(scores)}
+
+    def _order_moves_all(self, position, scores, symmetric=False):
+        # Every legal column (up to the middle if symmetric), best scored
+        # first so the TT fills with its line
+        last = (position.cols - 1) // 2 if symmetric else position.cols - 1
+        moves = [col for col in center_order(position.cols) if position.can_play(col) and col <= last]
+        moves.sort(key=lambda col: -scores.get(col, 0))
+        return moves
+
+    def _proven(self, scores):
+        # Every column is a proven win, loss or solved draw
+        return bool(scores) and all(abs(score) >= 1000000 for score in scores.values())
+
+    def _mirror_scores(self, scores, cols):
+        return {cols - 1 - col: score for col, score in scores.items()}
+
+    def _solve_columns(self, position, symmetric=False, deadline=None):
+        """
+        (depth, scores) with exact scores for every column from the endgame
+        solver, or (0, {}) if it runs out of nodes or time, or is stopped.
+        """
+        empty = position.rows * position.cols - position.moves
+        last = (position.cols - 1) // 2 if symmetric else position.cols - 1
+        scores = {}
+        for col in center_order(position.cols):
+            if not position.can_play(col) or col > last:
+                continue
+            if position.is_winning_move(col):
+                scores[col] = self._solver_score((empty + 1) // 2)
+                continue
+            position.make_move(col)
+            try:
+                exact = -self.solver.solve(position, deadline, self._stop_event) \
+                    if not position.is_full() else 0
+            except SolverAborted:
+                return 0, {}
+            finally:
+                position.unmake_move(col)
+                self.nodes += self.solver.nodes
+            scores[col] = self._solver_score(exact)
+        if symmetric:
+            scores.update(self._mirror_scores(scores, position.cols))
+        return empty, scores
+
+    def find_best_move(self, board, time_budget_ms=None, node_budget=None, stop_event=None):
+        """
+        Returns the column to play. `board` is a Connect4 game in which the
+        AI is the current player, or a list-of-lists board of piece strings.
+        Budgets passed here override the ones given to the constructor for
+        this call only; see search_position for `stop_event`.
+        """
+        position = self._position_of(board)
+        best_col, minimax_score = self.search_position(position, time_budget_ms, node_budget, stop_event)
 
         return best_col
- 
\ No newline at end of file
@@ -0,0 +1,141 @@
+from functools import lru_cache
+
+import numpy as np
+
+EMPTY = '   '
+
+# Cell codes of the int8 board encoding
+EMPTY_CELL = 0
+OWN_CELL = 1
+OPP_CELL = -1
+
+
+@lru_cache(maxsize=None)
+def window_index_table(rows, cols, connect=4):
+    """
+    Returns a read-only (windows, connect) array of flat cell indices
+    (row * cols + col, row 0 at the top) with one line per window, in the
+    same order MiniMaxAI._heuristic_score visits them.
+    """
+    n = connect
+    windows = []
+
+    # Horizontal Window
+    for row in range(rows):
+        for col in range(cols - n + 1):
+            windows.append([row * cols + col + i for i in range(n)])
+    # Vertical Window
+    for col in range(cols):
+        for row in range(rows - n + 1):
+            windows.append([(row + i) * cols + col for i in range(n)])
+    # Diagonal (/) Window
+    for col in range(cols - n + 1):
+        for row in range(rows - 1, n - 2, -1):
+            windows.append([(row - i) * cols + col + i for i in range(n)])
+    # Diagonal (\) Window
+    for col in range(cols - n + 1):
+        for row in range(rows - n + 1):
+            windows.append([(row + i) * cols + col + i for i in range(n)])
+
+    table = np.array(windows, dtype=np.intp).reshape(len(windows), n)
+    table.setflags(write=False)
+    return table
+
+
+class NumpyEvaluator:
+    """
+    Vectorized version of MiniMaxAI._heuristic_score.
+
+    Boards are encoded as flat int8 arrays (OWN_CELL / OPP_CELL / EMPTY_CELL)
+    and every window is gathered at once through window_index_table, so one
+    call scores one board or a whole (N, rows * cols) stack of them.
+
+    Per single leaf the NumPy call overhead is larger than the bitboard
+    popcount loop the search uses, so this is meant for bulk scoring
+    (batches of leaves, training data, analysis).
+    """
+
+    def __init__(self, player_piece, opponent_piece, rows=6, cols=7,
+                 win_score=1000, three_score=100, two_score=10, connect=4):
+        self.player_piece = player_piece
+        self.opponent_piece = opponent_piece
+        self.rows = rows
+        self.cols = cols
+        self.connect = connect
+        self.windows = window_index_table(rows, cols, connect)
+
+        self.WIN_SCORE = win_score
+        self.THREE_IN_A_ROW_SCORE = three_score
+        self.TWO_IN_A_ROW_SCORE = two_score
+
+    @classmethod
+    def from_ai(cls, ai, rows=6, cols=7):
+        """
+        Builds an evaluator with the same pieces and weights as a MiniMaxAI.
+        """
+        return cls(ai.player_piece, ai.opponent_piece, rows, cols,
+                   ai.WIN_SCORE, ai.THREE_IN_A_ROW_SCORE, ai.TWO_IN_A_ROW_SCORE, ai.connect)
+
+    def encode(self, board):
+        """
+        Encodes a Connect4 list-of-lists board as a flat int8 array.
+        """
+        encoded = np.zeros(self.rows * self.cols, dtype=np.int8)
+        for row in range(self.rows):
+            for col in range(self.cols):
+                cell = board[row][col]
+                if cell == self.player_piece:
+                    encoded[row * self.cols + col] = OWN_CELL
+                elif cell == self.opponent_piece:
+                    encoded[row * self.cols + col] = OPP_CELL
+        return encoded
+
+    def encode_position(self, position, side=0):
+        """
+        Encodes a bitboard Position as a flat int8 array from `side`'s
+        point of view.
+        """
+        encoded = np.zeros(self.rows * self.cols, dtype=np.int8)
+        own, opp = position.masks[side], position.masks[side ^ 1]
+        for col in range(self.cols):
+            for height in range(position.heights[col]):
+                bit = 1 << (col * position.height + height)
+                index = (self.rows - 1 - height) * self.cols + col
+                encoded[index] = OWN_CELL if own & bit else OPP_CELL if opp & bit else EMPTY_CELL
+        return encoded
+
+    def score_batch(self, boards):
+        """
+        Scores a stack of encoded boards shaped (N, rows * cols) or
+        (N, rows, cols). Returns an int64 array of N scores.
+        """
+        boards = np.asarray(boards, dtype=np.int8).reshape(len(boards), -1)
+        windows = boards[:, self.windows]                  # (N, windows, connect)
+        n = self.connect
+
+        own = np.count_nonzero(windows == OWN_CELL, axis=2)
+        opp = np.count_nonzero(windows == OPP_CELL, axis=2)
+        empty = n - own - opp
+
+        own_score = np.select(
+            [own == n, (own == n - 1) & (empty == 1), (own == n - 2) & (empty == 2)],
+            [self.WIN_SCORE, self.THREE_IN_A_ROW_SCORE, self.TWO_IN_A_ROW_SCORE],
+            default=0)
+        opp_score = np.select(
+            [(opp == n - 1) & (empty == 1), opp == n],
+            [self.THREE_IN_A_ROW_SCORE, self.WIN_SCORE],
+            default=0)
+
+        return (own_score - opp_score).sum(axis=1, dtype=np.int64)
+
+    def score(self, board):
+        """
+        Scores one encoded board (flat or (rows, cols) int8 array).
+        """
+        return int(self.score_batch(np.asarray(board)[np.newaxis])[0])
+
+    def score_board(self, board):
+        """
+        Same value as MiniMaxAI._heuristic_score(board, player_piece).
+        """
+        return self.score(self.encode(board))
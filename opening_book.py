@@ -0,0 +1,165 @@
+import argparse
+import mmap
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+
+from bitboard import Position
+
+# File layout: a header, then `count` records sorted by key.
+#   header: magic, version, rows, cols, plies, pad, count
+#   record: canonical mover key (u64), best column (i8), score (i32)
+MAGIC = b'C4BK'
+VERSION = 1
+HEADER = struct.Struct('<4sBBBBxxxxI')
+RECORD = struct.Struct('<Qbi')
+
+
+class OpeningBook:
+    """
+    Read-only opening book, memory-mapped and binary searched in place.
+
+    Positions are stored once per mirror pair under
+    Position.canonical_mover_key(), with the best column and score for the
+    side to move. Because the file is mapped rather than read, every
+    process using the same book shares its pages through the OS cache.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self.rows, self.cols, self.plies, self.count = \
+            HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a version {VERSION} opening book")
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def _find(self, key):
+        data = self._map
+        low, high = 0, self.count - 1
+        while low <= high:
+            middle = (low + high) // 2
+            offset = HEADER.size + middle * RECORD.size
+            stored = RECORD.unpack_from(data, offset)
+            if stored[0] == key:
+                return stored
+            if stored[0] < key:
+                low = middle + 1
+            else:
+                high = middle - 1
+        return None
+
+    def lookup(self, position):
+        """
+        Returns (column, score) for the side to move, or None if the
+        position is not in the book.
+        """
+        # Books are only built for the connect 4 rules
+        if position.rows != self.rows or position.cols != self.cols or \
+           position.connect != 4 or position.moves > self.plies:
+            return None
+
+        key, mirrored = position.canonical_mover_key()
+        record = self._find(key)
+        if record is None:
+            return None
+
+        _, col, score = record
+        if mirrored:
+            col = position.cols - 1 - col
+        return col, score
+
+
+# --- Building ---
+def enumerate_positions(plies, rows=6, cols=7):
+    """
+    Yields one Position per mirror class for every non-terminal position
+    reachable in at most `plies` moves.
+    """
+    seen = set()
+    frontier = [Position(rows, cols)]
+    for ply in range(plies + 1):
+        next_frontier = []
+        for position in frontier:
+            key, _ = position.canonical_mover_key()
+            if key in seen:
+                continue
+            seen.add(key)
+            yield position
+
+            if ply == plies:
+                continue
+            for col in position.valid_moves():
+                if position.is_winning_move(col):
+                    continue # Children would be terminal
+                child = position.copy()
+                child.make_move(col)
+                next_frontier.append(child)
+        frontier = next_frontier
+
+
+_builder_ai = None
+
+
+def _analyse(args):
+    global _builder_ai
+    position, depth = args
+    key, mirrored = position.canonical_mover_key()
+    # The AI searches as side 0, so hand it the side to move as side 0
+    if position.to_move == 1:
+        position.masks.reverse()
+        position.to_move = 0
+
+    if _builder_ai is None:
+        from minimax_ai import MiniMaxAI
+        _builder_ai = MiniMaxAI('\033[31m o \033[0m', level=depth)
+    _builder_ai.reset()
+    _builder_ai.level = depth
+    col, score = _builder_ai.search_position(position)
+    # Store the move for the canonical orientation
+    if mirrored:
+        col = position.cols - 1 - col
+    return key, col, score
+
+
+def build_book(path, plies=4, depth=8, rows=6, cols=7, workers=1):
+    """
+    Searches every position up to `plies` moves deep to `depth` and writes
+    the results to `path`. Returns the number of records written.
+    """
+    jobs = [(position, depth) for position in enumerate_positions(plies, rows, cols)]
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            records = list(executor.map(_analyse, jobs, chunksize=16))
+    else:
+        records = [_analyse(job) for job in jobs]
+    records.sort()
+
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, rows, cols, plies, len(records)))
+        for key, col, score in records:
+            file.write(RECORD.pack(key, col, score))
+    return len(records)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build a Connect 4 opening book")
+    parser.add_argument('path', nargs='?', default='opening_book.bin')
+    parser.add_argument('--plies', type=int, default=4, help="deepest book position, in moves")
+    parser.add_argument('--depth', type=int, default=8, help="search depth per position")
+    parser.add_argument('--workers', type=int, default=1)
+    args = parser.parse_args()
+
+    start = perf_counter()
+    count = build_book(args.path, args.plies, args.depth, workers=args.workers)
+    print(f"Wrote {count} positions to {args.path} in {perf_counter() - start:.1f}s")
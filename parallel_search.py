@@ -0,0 +1,268 @@
+import argparse
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from time import perf_counter
+
+from bitboard import EMPTY
+from incremental_eval import IncrementalEvaluator
+from minimax_ai import MiniMaxAI, _SearchAborted
+
+# Seconds the master waits for a worker before checking its own budget
+POLL_INTERVAL = 0.01
+
+# --- Worker Side ---
+# Every worker process keeps one MiniMaxAI (and so one TT, killer and
+# history table) for as long as the master's game lasts.
+_worker_ai = None
+_worker_key = None
+# Set by the master to abort every running task (see RootParallelSearch)
+_stop_event = None
+
+
+def _init_worker(stop_event):
+    global _stop_event
+    _stop_event = stop_event
+
+
+def _worker(config, game_id):
+    global _worker_ai, _worker_key
+    key = (tuple(sorted(config.items())), game_id)
+    if key != _worker_key:
+        weights = config.copy()
+        _worker_ai = MiniMaxAI(weights.pop('player_piece'), level=weights.pop('level'),
+                               tt_buckets=weights.pop('tt_buckets'),
+                               move_ordering=weights.pop('move_ordering'))
+        for name, value in weights.items():
+            setattr(_worker_ai, name, value)
+        _worker_ai._stop_event = _stop_event
+        _worker_key = key
+    return _worker_ai
+
+
+def _search_root_move(config, game_id, position, move, depth, alpha, time_budget_ms, node_budget):
+    """
+    Plays `move` for the AI and searches the reply tree to depth - 1.
+    Returns (move, score, nodes, leaf evaluations, cutoffs by move index,
+    principal variation from `move`, read back from this worker's TT);
+    score is None if the budget ran out.
+    """
+    ai = _worker(config, game_id)
+    ai.nodes = 0
+    ai.leaf_evals = 0
+    ai.cutoffs_by_index = [0] * position.cols
+    ai.tt.new_search()
+    ai._evaluator = IncrementalEvaluator(position, ai.WIN_SCORE,
+                                         ai.THREE_IN_A_ROW_SCORE, ai.TWO_IN_A_ROW_SCORE)
+    ai._evaluator.make_move(position, move)
+
+    if time_budget_ms is not None or node_budget is not None or ai._stop_event is not None:
+        deadline = None if time_budget_ms is None else perf_counter() + time_budget_ms / 1000
+        ai._set_budget(deadline, node_budget)
+    line = [move]
+    try:
+        reply, score = ai._minimax(position, depth - 1, False, alpha, float('inf'))
+    except _SearchAborted:
+        score = None
+    else:
+        if ai._score_position(position) is None:
+            line += ai._principal_variation(position, reply, depth - 1)
+    finally:
+        ai._clear_budget()
+
+    return move, score, ai.nodes, ai.leaf_evals, ai.cutoffs_by_index, line
+
+
+# --- Master Side ---
+class RootParallelSearch:
+    """
+    Splits the root moves of a MiniMaxAI search over a persistent process
+    pool, young-brothers-wait style: the first ordered move is searched
+    alone to get an alpha bound, then the other moves go out `workers` at a
+    time, each started with the best score known at submission.
+
+    Workers search with alpha - 1 so moves that tie the best score come
+    back exact, and ties go to the earliest move in root order, like the
+    serial search. The budgets of the owning AI apply to the search as a
+    whole: the node budget left is shared among the tasks in flight, and
+    the stop event, deadline and node budget are checked while the workers
+    run. The root result goes into the AI's TT like a serial search's;
+    the rest of the principal variation lives in the workers' tables, so
+    it is kept in `pv`.
+    """
+
+    def __init__(self, ai, workers):
+        self.ai = ai
+        self.workers = workers
+        self.stop_event = multiprocessing.Event()
+        self.pv = [] # Principal variation of the last completed search
+        self.executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                            initargs=(self.stop_event,))
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+
+    def _config(self):
+        ai = self.ai
+        return {
+            'player_piece': ai.player_piece,
+            'level': ai.level,
+            'tt_buckets': ai.tt_buckets,
+            'move_ordering': ai.move_ordering,
+            'symmetry': ai.symmetry,
+            'WIN_SCORE': ai.WIN_SCORE,
+            'THREE_IN_A_ROW_SCORE': ai.THREE_IN_A_ROW_SCORE,
+            'TWO_IN_A_ROW_SCORE': ai.TWO_IN_A_ROW_SCORE,
+        }
+
+    def _stopped(self):
+        # What _check_budget would raise for, but only inside a budget, so
+        # depth 1 of iterative deepening still always completes
+        ai = self.ai
+        if ai._check_at == float('inf'):
+            return False
+        if ai._stop_event is not None and ai._stop_event.is_set():
+            return True
+        if ai._node_limit is not None and ai.nodes >= ai._node_limit:
+            return True
+        return ai._deadline is not None and perf_counter() >= ai._deadline
+
+    def _abort(self, running):
+        # Stops the running tasks and waits for them, so none is still
+        # searching (with the stop event set) when the next search starts
+        for future in running:
+            future.cancel()
+        self.stop_event.set()
+        wait(running)
+        self.stop_event.clear()
+        raise _SearchAborted
+
+    def search(self, position, depth, first_move=None):
+        ai = self.ai
+        self.pv = []
+        if depth == 0 or ai._score_position(position) is not None:
+            return ai._minimax(position, depth, True, -float('inf'), float('inf'))
+
+        config = self._config()
+        symmetric = ai.symmetry and position.mirror_key() == position.key()
+        moves = ai._order_moves(position, first_move, symmetric)
+        pending = list(moves)
+        running = {} # future -> (move, node budget it was given)
+        scores = {}
+        lines = {}
+        best_score = -float('inf')
+
+        def submit(move):
+            alpha = best_score - 1 if best_score != -float('inf') else best_score
+            time_left = None
+            if ai._deadline is not None:
+                time_left = max(0.0, (ai._deadline - perf_counter()) * 1000)
+            nodes_left = None
+            if ai._node_limit is not None:
+                # Finished tasks are charged to ai.nodes and running ones
+                # keep their share; the rest is split over the free workers
+                reserved = sum(budget for _, budget in running.values())
+                unreserved = max(0, ai._node_limit - ai.nodes - reserved)
+                nodes_left = unreserved // (self.workers - len(running))
+            future = self.executor.submit(_search_root_move, config, ai._game_id, position,
+                                          move, depth, alpha, time_left, nodes_left)
+            running[future] = move, nodes_left or 0
+
+        # Young brothers wait: the first move alone sets the bound
+        submit(pending.pop(0))
+        aborted = False
+        while running:
+            done, _ = wait(running, timeout=POLL_INTERVAL, return_when=FIRST_COMPLETED)
+            if self._stopped():
+                self._abort(running)
+            for future in done:
+                del running[future]
+                move, score, nodes, leaf_evals, cutoffs_by_index, line = future.result()
+                ai.nodes += nodes
+                ai.leaf_evals += leaf_evals
+                for index, count in enumerate(cutoffs_by_index):
+                    ai.cutoffs_by_index[index] += count
+                if score is None:
+                    aborted = True
+                    continue
+                scores[move] = score
+                lines[move] = line
+                best_score = max(best_score, score)
+
+            if aborted:
+                self._abort(running)
+            if best_score >= 1000000:
+                # Only moves already running could still tie a proven win
+                pending.clear()
+
+            while pending and len(running) < self.workers:
+                submit(pending.pop(0))
+
+        best_move = next(move for move in moves if scores.get(move) == best_score)
+        # Full window at the root, so the entry is exact
+        key, mirrored = ai._tt_key(position)
+        ai._store(key, depth, best_score, position.cols - 1 - best_move if mirrored else best_move,
+                  -float('inf'), float('inf'))
+        self.pv = lines[best_move]
+        return best_move, best_score
+
+
+# --- Benchmark ---
+BENCH_POSITIONS = ['', '3', '33', '3324', '332415', '33240125', '3324012566']
+
+
+def _board_from_moves(moves, first_piece, second_piece, rows=6, cols=7):
+    board = [[EMPTY for _ in range(cols)] for _ in range(rows)]
+    pieces = (first_piece, second_piece)
+    for ply, char in enumerate(moves):
+        col = int(char)
+        for row in range(rows - 1, -1, -1):
+            if board[row][col] == EMPTY:
+                board[row][col] = pieces[ply % 2]
+                break
+    return board
+
+
+def benchmark(depth=7, max_workers=None):
+    """
+    Times fixed-depth searches on BENCH_POSITIONS for 1..max_workers
+    processes and prints the speedup and speedup per core against the
+    serial search. Also checks every run picks the serial best move.
+    """
+    red, blue = '\033[31m o \033[0m', '\033[34m o \033[0m'
+    max_workers = max_workers or os.cpu_count() or 1
+    boards = []
+    for moves in BENCH_POSITIONS:
+        # The AI (blue) is always the side to move
+        first, second = (blue, red) if len(moves) % 2 == 0 else (red, blue)
+        boards.append(_board_from_moves(moves, first, second))
+
+    serial_time = None
+    serial_moves = None
+    for workers in range(1, max_workers + 1):
+        chosen = []
+        elapsed = 0.0
+        nodes = 0
+        ai = MiniMaxAI(blue, level=depth, workers=workers)
+        for board in boards:
+            ai.reset()
+            start = perf_counter()
+            chosen.append(ai.find_best_move(board))
+            elapsed += perf_counter() - start
+            nodes += ai.nodes
+        ai.close()
+
+        if serial_time is None:
+            serial_time, serial_moves = elapsed, chosen
+        speedup = serial_time / elapsed
+        print(f"workers={workers}  time={elapsed:.2f}s  nodes={nodes}  "
+              f"speedup={speedup:.2f}x  per core={speedup / workers:.2f}  "
+              f"same moves={chosen == serial_moves}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Root-parallel search benchmark")
+    parser.add_argument('--depth', type=int, default=7)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+    benchmark(args.depth, args.workers)
@@ -0,0 +1,310 @@
+import argparse
+import json
+import os
+import random
+import sys
+from time import perf_counter
+
+from bitboard import Position
+from connect4_cli import EMPTY, P1, P2, PIECES
+from connect4_engine.query import game_from_moves
+from incremental_eval import IncrementalEvaluator
+from minimax_ai import MiniMaxAI
+
+# Suite files hold one position per line:
+#   <moves> <check> [<check> ...]   # optional comment
+# <moves> is a move string as read by connect4_engine.query.parse_moves
+# (digits, or comma separated numbers), or "-" for the empty board. The
+# checks are for the side to move:
+#   best=3 / best=2,4   the engine plays one of these columns
+#   avoid=0,6           the engine plays none of these
+#   win / loss          the search proves a forced win / loss
+#   draw                the search proves the position is a draw
+DEFAULT_SUITE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'positions.txt')
+# Default engine: a fixed depth search, so node counts are reproducible
+DEFAULT_ENGINE = {'level': 8}
+OUTCOMES = ('win', 'loss', 'draw')
+
+
+def parse_line(line):
+    """
+    (moves, checks, comment) of one suite line, or None for a blank or
+    comment line. `checks` maps 'best' / 'avoid' to column sets and
+    'outcome' to one of OUTCOMES.
+    """
+    line, _, comment = line.partition('#')
+    fields = line.split()
+    if not fields:
+        return None
+    moves = '' if fields[0] == '-' else fields[0]
+    checks = {}
+    for field in fields[1:]:
+        name, _, value = field.partition('=')
+        if name in OUTCOMES and not value:
+            checks['outcome'] = name
+        elif name in ('best', 'avoid') and value:
+            checks[name] = {int(col) for col in value.split(',')}
+        else:
+            raise ValueError(f"unknown check {field!r}")
+    return moves, checks, comment.strip()
+
+
+def load_suite(path=DEFAULT_SUITE):
+    """
+    The positions of a suite file, as dicts with the line number, moves,
+    checks and comment.
+    """
+    entries = []
+    with open(path) as file:
+        for number, line in enumerate(file, 1):
+            try:
+                parsed = parse_line(line)
+            except ValueError as error:
+                raise ValueError(f"{path}:{number}: {error}") from None
+            if parsed is not None:
+                moves, checks, comment = parsed
+                entries.append({'line': number, 'moves': moves, 'checks': checks,
+                                'comment': comment})
+    return entries
+
+
+def phase_of(position):
+    empty = position.rows * position.cols - position.moves
+    if position.moves < 10:
+        return 'early'
+    return 'endgame' if empty <= 18 else 'middle'
+
+
+# --- Evaluation Checks ---
+def list_board(game):
+    return [[PIECES[game.get_piece(row, col)] for col in range(game.cols)]
+            for row in range(game.rows)]
+
+
+def check_evaluation(ai, game):
+    """
+    Compares the list board scoring (_score_board, _heuristic_score) with
+    the bitboard scoring the search uses (_score_position,
+    _heuristic_position and the IncrementalEvaluator) on the position and
+    on the position after each legal move. Returns the mismatches.
+    """
+    board = list_board(game)
+    position = game.to_position()
+    pairs = [('root', board, position)]
+    for col in position.valid_moves():
+        child = position.copy()
+        child.make_move(col)
+        pairs.append((f"after {col}", ai._simulate_move(board, col, ai.player_piece), child))
+
+    errors = []
+    for name, board, position in pairs:
+        terminal = (ai._score_board(board), ai._score_position(position))
+        if terminal[0] != terminal[1]:
+            errors.append(f"{name}: _score_board {terminal[0]} != _score_position {terminal[1]}")
+        heuristic = (ai._heuristic_score(board, ai.player_piece), ai._heuristic_position(position),
+                     IncrementalEvaluator(position, ai.WIN_SCORE, ai.THREE_IN_A_ROW_SCORE,
+                                          ai.TWO_IN_A_ROW_SCORE).score)
+        if len(set(heuristic)) > 1:
+            errors.append(f"{name}: _heuristic_score / _heuristic_position / incremental "
+                          f"{heuristic[0]} / {heuristic[1]} / {heuristic[2]}")
+    return errors
+
+
+def position_board(position):
+    # List board of a Position, side 0 as P1 and side 1 as P2
+    board = [[PIECES[EMPTY]] * position.cols for _ in range(position.rows)]
+    for col in range(position.cols):
+        for height in range(position.heights[col]):
+            side = 0 if position.masks[0] >> (col * position.height + height) & 1 else 1
+            board[position.rows - 1 - height][col] = PIECES[(P1, P2)[side]]
+    return board
+
+
+def check_random_games(count, seed=0, engine=DEFAULT_ENGINE):
+    """
+    Plays `count` random games, keeping one IncrementalEvaluator in sync
+    through make_move / unmake_move: a side move is tried and taken back
+    at every ply, and the whole game is unmade at the end. After every
+    step its score must equal _heuristic_score and _heuristic_position;
+    the positions of each game are also scored in one NumpyEvaluator
+    batch. Returns (positions checked, errors).
+    """
+    from numpy_eval import NumpyEvaluator
+
+    rng = random.Random(seed)
+    ai = MiniMaxAI(PIECES[P1], **engine)
+    numpy_evaluator = NumpyEvaluator.from_ai(ai)
+    errors = []
+    checked = 0
+    for number in range(count):
+        position = Position()
+        evaluator = IncrementalEvaluator(position, ai.WIN_SCORE, ai.THREE_IN_A_ROW_SCORE,
+                                         ai.TWO_IN_A_ROW_SCORE)
+        played = []
+        steps, boards, expected = [], [], []
+
+        def check(step):
+            nonlocal checked
+            checked += 1
+            scores = (ai._heuristic_score(position_board(position), ai.player_piece),
+                      ai._heuristic_position(position), evaluator.score)
+            steps.append(step)
+            boards.append(numpy_evaluator.encode_position(position))
+            expected.append(scores[0])
+            if len(set(scores)) > 1:
+                errors.append(f"game {number} {step}: _heuristic_score / _heuristic_position / "
+                              f"incremental {scores[0]} / {scores[1]} / {scores[2]}")
+
+        check('-')
+        while True:
+            moves = position.valid_moves()
+            side = rng.choice(moves)
+            evaluator.make_move(position, side)
+            line = ''.join(map(str, played)) or '-'
+            check(f"{line} + {side}")
+            evaluator.unmake_move(position, side)
+            check(f"{line} + {side} - {side}")
+
+            col = rng.choice(moves)
+            over = position.is_winning_move(col) or position.moves + 1 == position.rows * position.cols
+            evaluator.make_move(position, col)
+            played.append(col)
+            check(''.join(map(str, played)))
+            if over:
+                break
+        while played:
+            evaluator.unmake_move(position, played.pop())
+            check(f"unmade to {''.join(map(str, played)) or '-'}")
+
+        for step, score, batch_score in zip(steps, expected, numpy_evaluator.score_batch(boards)):
+            if batch_score != score:
+                errors.append(f"game {number} {step}: _heuristic_score {score} != "
+                              f"NumpyEvaluator {batch_score}")
+    ai.close()
+    return checked, errors
+
+
+def check_result(checks, move, score, proven):
+    # `proven`: the score is exact (SearchStats.proven)
+    errors = []
+    if 'best' in checks and move not in checks['best']:
+        errors.append(f"played {move}, expected {sorted(checks['best'])}")
+    if 'avoid' in checks and move in checks['avoid']:
+        errors.append(f"played {move}, which should be avoided")
+    outcome = checks.get('outcome')
+    if outcome == 'win' and not score >= 1000000:
+        errors.append(f"score {score} is not a proven win")
+    elif outcome == 'loss' and not score <= -1000000:
+        errors.append(f"score {score} is not a proven loss")
+    elif outcome == 'draw' and not (score == 0 and proven):
+        errors.append(f"score {score} is not a proven draw")
+    return errors
+
+
+# --- Runner ---
+def run_entry(entry, engine=DEFAULT_ENGINE):
+    """
+    Searches one suite position with a fresh MiniMaxAI(**engine) and
+    checks the result. Returns a dict with the move, score, nodes, ms,
+    nodes per second and the list of errors (empty if it passed).
+    """
+    game = game_from_moves(entry['moves'])
+    if game.game_over:
+        raise ValueError(f"line {entry['line']}: the game is already over")
+    ai = MiniMaxAI(PIECES[game.current_player], **engine)
+    position = game.to_position()
+
+    errors = check_evaluation(ai, game)
+    start = perf_counter()
+    move, score = ai.search_position(position)
+    elapsed = perf_counter() - start
+    ai.close()
+    stats = ai.stats
+    errors += check_result(entry['checks'], move, score, stats.proven)
+    return {
+        'line': entry['line'],
+        'moves': entry['moves'] or '-',
+        'phase': phase_of(position),
+        'move': move,
+        'score': score,
+        'source': stats.source,
+        'nodes': stats.nodes,
+        'ms': elapsed * 1000,
+        'nps': stats.nodes / elapsed if elapsed else 0.0,
+        'errors': errors,
+    }
+
+
+def run_suite(entries, engine=DEFAULT_ENGINE, report=None):
+    """
+    Runs every entry, calling report(result) after each one. Returns the
+    results and a summary with totals per phase.
+    """
+    results = []
+    for entry in entries:
+        result = run_entry(entry, engine)
+        results.append(result)
+        if report:
+            report(result)
+
+    summary = {}
+    for phase in ('early', 'middle', 'endgame', 'all'):
+        chosen = [result for result in results if phase in ('all', result['phase'])]
+        if not chosen:
+            continue
+        nodes = sum(result['nodes'] for result in chosen)
+        ms = sum(result['ms'] for result in chosen)
+        summary[phase] = {
+            'positions': len(chosen),
+            'failed': sum(1 for result in chosen if result['errors']),
+            'nodes': nodes,
+            'ms': round(ms, 1),
+            'nps': round(nodes / (ms / 1000)) if ms else 0,
+        }
+    return results, summary
+
+
+def print_result(result):
+    status = 'FAIL' if result['errors'] else 'ok'
+    print(f"{result['line']:>4} {result['moves']:<24} {result['phase']:<8} {result['move']!s:>4} "
+          f"{result['score']!s:>9} {result['source']:<7} {result['nodes']:>9} "
+          f"{result['ms']:>9.1f} {result['nps']:>8.0f}  {status}")
+    for error in result['errors']:
+        print(f"       {error}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check MiniMaxAI against a suite of known positions")
+    parser.add_argument('suite', nargs='?', default=DEFAULT_SUITE)
+    parser.add_argument('--engine', default=json.dumps(DEFAULT_ENGINE),
+                        help="JSON MiniMaxAI kwargs (keep it budget free for reproducible nodes)")
+    parser.add_argument('--no-solver', action='store_true',
+                        help="search endgames with _minimax instead of the endgame solver")
+    parser.add_argument('--json', action='store_true', help="print the results as JSON")
+    parser.add_argument('--random', type=int, metavar='N',
+                        help="instead check the evaluators on N random games (make / unmake)")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the --random games")
+    args = parser.parse_args()
+
+    engine = json.loads(args.engine)
+    if args.no_solver:
+        engine['solver_threshold'] = 0
+    if args.random is not None:
+        checked, errors = check_random_games(args.random, args.seed, engine)
+        for error in errors:
+            print(error)
+        print(f"{args.random} random games  {checked} positions  {len(errors)} mismatches")
+        sys.exit(1 if errors else 0)
+    entries = load_suite(args.suite)
+    if not args.json:
+        print(f"{'line':>4} {'moves':<24} {'phase':<8} {'move':>4} {'score':>9} {'source':<7} "
+              f"{'nodes':>9} {'ms':>9} {'nps':>8}")
+    results, summary = run_suite(entries, engine, None if args.json else print_result)
+    if args.json:
+        print(json.dumps({'results': results, 'summary': summary}, indent=2))
+    else:
+        print()
+        for phase, totals in summary.items():
+            print(f"{phase:<8} {totals['positions']:>3} positions  {totals['failed']} failed  "
+                  f"{totals['nodes']} nodes  {totals['ms']:.0f} ms  {totals['nps']} nodes/s")
+    sys.exit(1 if any(result['errors'] for result in results) else 0)
@@ -0,0 +1,197 @@
+import argparse
+import random
+from collections import Counter
+from time import perf_counter
+
+from bitboard import Position, window_masks
+from connect4_engine.query import game_from_moves
+from minimax_ai import MiniMaxAI
+from parallel_search import BENCH_POSITIONS, _board_from_moves
+
+# The search's hot methods, plus the list based reference helpers so calls
+# that sneak back onto the slow path show up
+DEFAULT_METHODS = ('_minimax', '_order_moves', '_score_position', '_record_cutoff',
+                   '_heuristic_score', '_score_board')
+
+# (rows, cols, connect) shapes for the board size benchmark
+BENCH_SHAPES = ((6, 7, 4), (9, 10, 4), (9, 10, 5), (12, 14, 4), (12, 14, 5))
+
+# Openings (symmetric up to '33') and symmetric middle games, plus two
+# lopsided positions for the cost of mirror hashing where it cannot help
+SYMMETRY_POSITIONS = ('', '3', '33', '234', '2145', '2145330165', '3324', '33240125')
+
+
+class SearchProfiler:
+    """
+    Opt-in counters for a MiniMaxAI's methods. While installed, each named
+    method is replaced on the instance by a wrapper that counts its calls
+    and, with `timed=True`, its self time (time not spent in other wrapped
+    methods). Nothing is wrapped otherwise, so a normal search pays nothing.
+
+        with SearchProfiler(ai) as profiler:
+            ai.find_best_move(board)
+        print(profiler.report())
+    """
+
+    def __init__(self, ai, methods=DEFAULT_METHODS, timed=True):
+        self.ai = ai
+        self.methods = methods
+        self.timed = timed
+        self.calls = Counter()
+        self.self_time = Counter()
+        self._stack = [] # Time spent in wrapped callees, per active call
+
+    def __enter__(self):
+        self.install()
+        return self
+
+    def __exit__(self, *exc):
+        self.remove()
+
+    def install(self):
+        for name in self.methods:
+            setattr(self.ai, name, self._wrap(name, getattr(self.ai, name)))
+
+    def remove(self):
+        for name in self.methods:
+            self.ai.__dict__.pop(name, None)
+
+    def reset(self):
+        self.calls.clear()
+        self.self_time.clear()
+
+    def _wrap(self, name, method):
+        calls = self.calls
+
+        if not self.timed:
+            def counted(*args, **kwargs):
+                calls[name] += 1
+                return method(*args, **kwargs)
+            return counted
+
+        self_time = self.self_time
+        stack = self._stack
+
+        def timed(*args, **kwargs):
+            calls[name] += 1
+            stack.append(0.0)
+            start = perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                elapsed = perf_counter() - start
+                self_time[name] += elapsed - stack.pop()
+                if stack:
+                    stack[-1] += elapsed
+        return timed
+
+    def report(self):
+        lines = [f"{'method':<18} {'calls':>10} {'self ms':>10} {'us/call':>8}"]
+        for name in sorted(self.methods, key=lambda name: -self.self_time[name]):
+            calls = self.calls[name]
+            ms = self.self_time[name] * 1000
+            per_call = ms * 1000 / calls if calls else 0.0
+            lines.append(f"{name:<18} {calls:>10} {ms:>10.1f} {per_call:>8.2f}")
+        return '\n'.join(lines)
+
+
+def random_positions(rows, cols, connect, count=6, plies=8, seed=0):
+    # Quiet openings: random moves that never complete a line
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        position = Position(rows, cols, connect)
+        while position.moves < plies:
+            moves = [col for col in position.valid_moves()
+                     if not position.is_winning_move(col)]
+            position.make_move(rng.choice(moves))
+        positions.append(position)
+    return positions
+
+
+def shape_benchmark(shapes=BENCH_SHAPES, depth=5, positions=6):
+    """
+    Per-node cost of a fixed-depth search (endgame solver off) on random
+    openings of each board shape, next to the cost of one full-board
+    heuristic rescan (what every leaf paid before evaluation became
+    incremental). Returns one dict per shape.
+    """
+    results = []
+    for rows, cols, connect in shapes:
+        ai = MiniMaxAI('x', level=depth, solver_threshold=0)
+        nodes = 0
+        elapsed = 0.0
+        rescan = 0.0
+        for position in random_positions(rows, cols, connect, positions):
+            ai.reset()
+            start = perf_counter()
+            ai.search_position(position)
+            elapsed += perf_counter() - start
+            nodes += ai.stats.nodes
+            start = perf_counter()
+            ai._heuristic_position(position)
+            rescan += perf_counter() - start
+        results.append({
+            'shape': f"{rows}x{cols} connect {connect}",
+            'windows': len(window_masks(rows, cols, connect)),
+            'nodes': nodes,
+            'us_per_node': elapsed * 1e6 / nodes,
+            'rescan_us': rescan * 1e6 / positions,
+        })
+    return results
+
+
+def symmetry_benchmark(depth=9, positions=SYMMETRY_POSITIONS):
+    """
+    Nodes and ms of a fixed-depth search (endgame solver off) on each
+    position with and without mirror-symmetric hashing and root pruning.
+    Returns one dict per position.
+    """
+    results = []
+    for moves in positions:
+        position = game_from_moves(moves).to_position()
+        row = {'moves': moves or '-', 'symmetric': position.mirror_key() == position.key()}
+        for symmetry in (False, True):
+            ai = MiniMaxAI('x', level=depth, solver_threshold=0, symmetry=symmetry)
+            start = perf_counter()
+            ai.search_position(position.copy())
+            prefix = 'on' if symmetry else 'off'
+            row[prefix + '_ms'] = (perf_counter() - start) * 1000
+            row[prefix + '_nodes'] = ai.stats.nodes
+        results.append(row)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Profile MiniMaxAI searches")
+    parser.add_argument('--depth', type=int, default=None,
+                        help="search depth (default 7, 5 with --shapes, 9 with --symmetry)")
+    parser.add_argument('--untimed', action='store_true', help="count calls only")
+    parser.add_argument('--shapes', action='store_true',
+                        help="benchmark the per-node cost on larger boards instead")
+    parser.add_argument('--symmetry', action='store_true',
+                        help="compare nodes and time with and without mirror symmetry instead")
+    args = parser.parse_args()
+
+    if args.symmetry:
+        print(f"{'moves':<12} {'sym':>4} {'nodes off':>10} {'nodes on':>10} {'saved':>6} "
+              f"{'ms off':>8} {'ms on':>8}")
+        for row in symmetry_benchmark(depth=args.depth or 9):
+            saved = 1 - row['on_nodes'] / row['off_nodes'] if row['off_nodes'] else 0.0
+            print(f"{row['moves']:<12} {'yes' if row['symmetric'] else 'no':>4} {row['off_nodes']:>10} "
+                  f"{row['on_nodes']:>10} {saved:>6.0%} {row['off_ms']:>8.0f} {row['on_ms']:>8.0f}")
+    elif args.shapes:
+        print(f"{'shape':<20} {'windows':>8} {'nodes':>8} {'us/node':>8} {'rescan us':>10}")
+        for row in shape_benchmark(depth=args.depth or 5):
+            print(f"{row['shape']:<20} {row['windows']:>8} {row['nodes']:>8} "
+                  f"{row['us_per_node']:>8.1f} {row['rescan_us']:>10.1f}")
+    else:
+        red, blue = '\033[31m o \033[0m', '\033[34m o \033[0m'
+        ai = MiniMaxAI(blue, level=args.depth or 7, solver_threshold=0)
+        ai.add_hook(lambda event, ai, stats: event == 'end' and print(stats.summary()))
+        with SearchProfiler(ai, timed=not args.untimed) as profiler:
+            for moves in BENCH_POSITIONS:
+                first, second = (blue, red) if len(moves) % 2 == 0 else (red, blue)
+                ai.reset()
+                ai.find_best_move(_board_from_moves(moves, first, second))
+        print(profiler.report())
@@ -0,0 +1,94 @@
+class SearchStats:
+    """
+    What one MiniMaxAI.search_position call did. A fresh object is made
+    for every search and left on the AI as `ai.stats`.
+
+      source            'book', 'solver' or 'search' ('mcts' for MCTSAI)
+      move, score       the result (score from the AI's point of view)
+      nodes             positions visited (including parallel workers);
+                        playouts for MCTSAI
+      leaf_evals        heuristic evaluations at the depth limit
+      cutoffs_by_index  beta cutoffs by the index of the move that caused
+                        them in the ordered move list
+      tt_hits, tt_probes  transposition table lookups during this search
+      depths            one dict per completed iteration:
+                        depth, move, score, nodes, ms
+      pv                principal variation, read back from the TT
+      elapsed_ms        wall time of the whole call
+      aborted           the budget or stop event cut the search short
+      proven            the score is exact, not a heuristic guess: a
+                        solver result, a forced win or loss, or a search
+                        that reached the end of the game
+      reused            MCTSAI: playouts inherited from the previous tree
+    """
+
+    def __init__(self):
+        self.source = 'search'
+        self.move = None
+        self.score = None
+        self.nodes = 0
+        self.leaf_evals = 0
+        self.cutoffs_by_index = []
+        self.tt_hits = 0
+        self.tt_probes = 0
+        self.depths = []
+        self.pv = []
+        self.elapsed_ms = 0.0
+        self.aborted = False
+        self.proven = False
+        self.reused = 0
+
+    @property
+    def depth(self):
+        return self.depths[-1]['depth'] if self.depths else 0
+
+    @property
+    def cutoffs(self):
+        return sum(self.cutoffs_by_index)
+
+    @property
+    def first_move_cutoff_rate(self):
+        cutoffs = self.cutoffs
+        return self.cutoffs_by_index[0] / cutoffs if cutoffs else 0.0
+
+    @property
+    def nodes_per_second(self):
+        return self.nodes / (self.elapsed_ms / 1000) if self.elapsed_ms else 0.0
+
+    def as_dict(self):
+        return {
+            'source': self.source,
+            'move': self.move,
+            'score': self.score,
+            'depth': self.depth,
+            'nodes': self.nodes,
+            'leaf_evals': self.leaf_evals,
+            'cutoffs': self.cutoffs,
+            'cutoffs_by_index': list(self.cutoffs_by_index),
+            'first_move_cutoff_rate': self.first_move_cutoff_rate,
+            'tt_hits': self.tt_hits,
+            'tt_probes': self.tt_probes,
+            'depths': [dict(entry) for entry in self.depths],
+            'pv': list(self.pv),
+            'elapsed_ms': self.elapsed_ms,
+            'nodes_per_second': self.nodes_per_second,
+            'aborted': self.aborted,
+            'proven': self.proven,
+            'reused': self.reused,
+        }
+
+    def summary(self):
+        """
+        One line for a console or window caption.
+        """
+        if self.source == 'mcts':
+            pv = ' '.join(str(col) for col in self.pv[:8])
+            return (f"mcts: move {self.move} win rate {self.score} playouts {self.nodes} "
+                    f"(+{self.reused} reused, {self.nodes_per_second:.0f}/s) "
+                    f"{self.elapsed_ms:.0f} ms pv {pv}")
+        if self.source != 'search':
+            return f"{self.source}: move {self.move} score {self.score} ({self.elapsed_ms:.0f} ms)"
+        pv = ' '.join(str(col) for col in self.pv)
+        return (f"depth {self.depth} score {self.score}{' (proven)' if self.proven else ''} nodes {self.nodes} "
+                f"({self.nodes_per_second / 1000:.0f}k/s) {self.elapsed_ms:.0f} ms "
+                f"first-move cutoffs {self.first_move_cutoff_rate:.0%} pv {pv}")
@@ -0,0 +1,204 @@
+import argparse
+import json
+import math
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+
+from connect4_cli import P1, P2, PIECES, Connect4
+from engines import create_ai
+from game_records import GameRecord, GameRecordWriter, engine_info
+from minimax_ai import DIFFICULTIES
+
+
+def parse_engine(spec):
+    """
+    An engine is a difficulty name ('hard') or a JSON object of MiniMaxAI
+    keyword arguments ('{"level": 6, "move_ordering": false}'). An
+    "engine" key picks another AI ('{"engine": "mcts", "time_budget_ms": 300}').
+    """
+    if spec in DIFFICULTIES:
+        return dict(DIFFICULTIES[spec])
+    return json.loads(spec)
+
+
+def create_player(piece, engine, seed):
+    # MCTS playouts are random too: unless the spec fixes a seed, derive
+    # one from the game's, so the game replays exactly (as long as the
+    # engine is limited by `playouts` rather than the clock)
+    kwargs = dict(engine)
+    if kwargs.get('engine') == 'mcts' and kwargs.get('difficulty') is None:
+        kwargs.setdefault('seed', seed)
+    return create_ai(piece, **kwargs)
+
+
+def play_game(args):
+    """
+    Plays one game. Engine A is red (moves first) on even game numbers.
+    The first `random_plies` moves are random, seeded by `seed`, so games
+    differ while staying reproducible; MCTS engines are seeded from it too.
+    Returns the winner ('a', 'b' or None), per-engine move stats and the
+    GameRecord of the game.
+    """
+    number, engine_a, engine_b, random_plies, seed = args
+    rng = random.Random(seed)
+    engines = {'a': engine_a, 'b': engine_b}
+    red_name, blue_name = ('a', 'b') if number % 2 == 0 else ('b', 'a')
+    players = {
+        P1: (red_name, create_player(PIECES[P1], engines[red_name], seed * 2)),
+        P2: (blue_name, create_player(PIECES[P2], engines[blue_name], seed * 2 + 1)),
+    }
+
+    stats = {'a': {'latencies': [], 'nodes': 0}, 'b': {'latencies': [], 'nodes': 0}}
+    game = Connect4()
+    winner = None
+    think_ms = {P1: 0.0, P2: 0.0}
+    while not game.game_over:
+        name, ai = players[game.current_player]
+        if game.moves < random_plies:
+            col = rng.choice([c for c in range(game.cols) if game.get_next_open_row(c) is not None])
+        else:
+            start = perf_counter()
+            col = ai.find_best_move(game)
+            stats[name]['latencies'].append(perf_counter() - start)
+            stats[name]['nodes'] += ai.stats.nodes
+            think_ms[game.current_player] += (perf_counter() - start) * 1000
+
+        ok, row = game.drop_piece(col)
+        if not ok:
+            raise RuntimeError(f"engine {name} played an illegal move {col}")
+        if game.check_win(row, col):
+            winner = name
+            game.game_over = True
+        elif game.check_draw():
+            game.game_over = True
+        else:
+            game.switch_player()
+
+    record = GameRecord.from_game(game, (engine_info(players[P1][1]), engine_info(players[P2][1])),
+                                  (think_ms[P1], think_ms[P2]))
+    for _, ai in players.values():
+        ai.close()
+    return winner, stats, record
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def elo_difference(score):
+    # Elo difference implied by an expected score, clamped away from 0 / 1
+    score = min(max(score, 0.001), 0.999)
+    return -400 * math.log10(1 / score - 1)
+
+
+def run_tournament(engine_a, engine_b, games=20, workers=1, random_plies=2, seed=0,
+                   record_path=None):
+    """
+    Plays `games` games and returns the JSON report. With `record_path`
+    every game is appended there as a GameRecord.
+    """
+    jobs = [(number, engine_a, engine_b, random_plies, seed * 100003 + number)
+            for number in range(games)]
+    start = perf_counter()
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(play_game, jobs))
+    else:
+        results = [play_game(job) for job in jobs]
+    elapsed = perf_counter() - start
+
+    if record_path is not None:
+        with GameRecordWriter(record_path) as writer:
+            for _, _, record in results:
+                writer.write(record)
+
+    wins = sum(1 for winner, _, _ in results if winner == 'a')
+    losses = sum(1 for winner, _, _ in results if winner == 'b')
+    draws = games - wins - losses
+    score = (wins + draws / 2) / games
+
+    report = {
+        'games': games,
+        'seed': seed,
+        'random_plies': random_plies,
+        'engine_a': engine_a,
+        'engine_b': engine_b,
+        'a_wins': wins,
+        'draws': draws,
+        'a_losses': losses,
+        'a_score': score,
+        'a_elo_diff': round(elo_difference(score), 1),
+        'wall_time_s': round(elapsed, 3),
+    }
+    for name in ('a', 'b'):
+        latencies = [t for _, stats, _ in results for t in stats[name]['latencies']]
+        nodes = sum(stats[name]['nodes'] for _, stats, _ in results)
+        total = sum(latencies)
+        report[name] = {
+            'moves': len(latencies),
+            'mean_latency_ms': round(1000 * total / len(latencies), 3) if latencies else 0.0,
+            'p95_latency_ms': round(1000 * percentile(latencies, 0.95), 3),
+            'nodes_per_s': round(nodes / total) if total else 0,
+        }
+    return report
+
+
+def check_regression(report, baseline, max_score_drop=0.1, max_latency_increase=0.25):
+    """
+    Returns a list of human readable regressions of engine A against a
+    previously saved report.
+    """
+    problems = []
+    if report['a_score'] < baseline['a_score'] - max_score_drop:
+        problems.append(f"score {report['a_score']:.3f} < baseline {baseline['a_score']:.3f} - {max_score_drop}")
+
+    old = baseline['a']['p95_latency_ms']
+    new = report['a']['p95_latency_ms']
+    if old and new > old * (1 + max_latency_increase):
+        problems.append(f"p95 latency {new:.1f} ms > baseline {old:.1f} ms + {max_latency_increase:.0%}")
+    return problems
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless AI self-play tournament")
+    parser.add_argument('--a', default='medium', help="difficulty name or JSON engine kwargs")
+    parser.add_argument('--b', default='easy', help="difficulty name or JSON engine kwargs")
+    parser.add_argument('--games', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--random-plies', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="write the JSON report here instead of stdout")
+    parser.add_argument('--record', help="append every game to this game record file")
+    parser.add_argument('--baseline', help="fail if engine A regressed against this report")
+    parser.add_argument('--save-baseline', help="also save the report as a new baseline")
+    parser.add_argument('--max-score-drop', type=float, default=0.1)
+    parser.add_argument('--max-latency-increase', type=float, default=0.25)
+    args = parser.parse_args()
+
+    report = run_tournament(parse_engine(args.a), parse_engine(args.b), args.games,
+                            args.workers, args.random_plies, args.seed, args.record)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(text + '\n')
+    else:
+        print(text)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as file:
+            file.write(text + '\n')
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            problems = check_regression(report, json.load(file),
+                                        args.max_score_drop, args.max_latency_increase)
+        for problem in problems:
+            print(f"REGRESSION: {problem}", file=sys.stderr)
+        if problems:
+            sys.exit(1)
@@ -0,0 +1,245 @@
+import argparse
+import json
+import os
+import random
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from time import perf_counter
+
+import numpy as np
+
+from connect4_cli import P1, PIECES, Connect4
+from minimax_ai import MiniMaxAI
+
+# One .npy file per column of the data set, all memory-mapped:
+#   keys    (N,)                 uint64  canonical mover key, for deduplication
+#   planes  (N, 2, rows, cols)   uint8   side to move's pieces, opponent's
+#                                        pieces; row 0 is the top row
+#   side    (N,)                 uint8   side to move (P1 / P2)
+#   score   (N,)                 int32   search score for the side to move
+#   move    (N,)                 int8    best column found by the search
+# meta.json holds the shape and how many rows are filled.
+COLUMNS = ('keys', 'planes', 'side', 'score', 'move')
+
+
+def cell_bits(rows, cols):
+    """
+    Bitboard bit of every cell, as a (rows, cols) array with row 0 at the top.
+    """
+    height = rows + 1
+    bits = np.empty((rows, cols), dtype=np.uint64)
+    for row in range(rows):
+        for col in range(cols):
+            bits[row, col] = col * height + (rows - 1 - row)
+    return bits
+
+
+class TrainingDataWriter:
+    """
+    Appends labelled positions to preallocated memory-mapped arrays in
+    directory `path`. Opening an existing directory resumes it: the rows
+    already written are kept and their keys seed the duplicate filter.
+    Positions are deduplicated on Position.canonical_mover_key(), so a
+    position and its left-right mirror are only stored once.
+    """
+
+    def __init__(self, path, capacity=10_000_000, rows=6, cols=7):
+        if (rows + 1) * cols > 64:
+            raise ValueError("positions must fit in a 64 bit key")
+        self.path = path
+        meta_path = os.path.join(path, 'meta.json')
+        if os.path.exists(meta_path):
+            with open(meta_path) as file:
+                meta = json.load(file)
+            capacity, rows, cols, self.count = meta['capacity'], meta['rows'], meta['cols'], meta['count']
+            mode = 'r+'
+        else:
+            os.makedirs(path, exist_ok=True)
+            self.count = 0
+            mode = 'w+'
+        self.capacity = capacity
+        self.rows = rows
+        self.cols = cols
+
+        shapes = {
+            'keys': ((capacity,), np.uint64),
+            'planes': ((capacity, 2, rows, cols), np.uint8),
+            'side': ((capacity,), np.uint8),
+            'score': ((capacity,), np.int32),
+            'move': ((capacity,), np.int8),
+        }
+        self.arrays = {}
+        for name in COLUMNS:
+            shape, dtype = shapes[name]
+            file_path = os.path.join(path, name + '.npy')
+            if mode == 'w+':
+                self.arrays[name] = np.lib.format.open_memmap(file_path, 'w+', dtype, shape)
+            else:
+                self.arrays[name] = np.lib.format.open_memmap(file_path, 'r+')
+
+        self._bits = cell_bits(rows, cols)
+        self.seen = set(self.arrays['keys'][:self.count].tolist())
+        self.duplicates = 0
+        self._save_meta()
+
+    def _save_meta(self):
+        meta = {'capacity': self.capacity, 'rows': self.rows, 'cols': self.cols, 'count': self.count}
+        with open(os.path.join(self.path, 'meta.json'), 'w') as file:
+            json.dump(meta, file)
+
+    def add(self, samples, limit=None):
+        """
+        Stores the new positions among `samples`, a list of
+        (key, mover mask, opponent mask, side, score, move) tuples, until
+        the data set holds `limit` rows (default: its capacity).
+        Returns how many were stored.
+        """
+        room = min(self.capacity, limit or self.capacity) - self.count
+        fresh = []
+        for sample in samples:
+            if sample[0] in self.seen:
+                self.duplicates += 1
+            elif len(fresh) < room:
+                self.seen.add(sample[0])
+                fresh.append(sample)
+        if not fresh:
+            return 0
+
+        keys, mover, opponent, side, score, move = (np.array(column) for column in zip(*fresh))
+        start, end = self.count, self.count + len(fresh)
+        planes = self.arrays['planes'][start:end]
+        planes[:, 0] = (mover.astype(np.uint64)[:, None, None] >> self._bits) & 1
+        planes[:, 1] = (opponent.astype(np.uint64)[:, None, None] >> self._bits) & 1
+        self.arrays['keys'][start:end] = keys
+        self.arrays['side'][start:end] = side
+        self.arrays['score'][start:end] = score
+        self.arrays['move'][start:end] = move
+        self.count = end
+        return len(fresh)
+
+    def close(self):
+        for array in self.arrays.values():
+            array.flush()
+        self._save_meta()
+
+
+# --- Self-play Workers ---
+_worker_ai = None
+
+
+def _play_games(args):
+    """
+    Plays `games` self-play games and returns their labelled positions as
+    (key, mover mask, opponent mask, side, score, move) tuples.
+    """
+    global _worker_ai
+    seed, games, engine, random_plies, epsilon, rows, cols = args
+    if _worker_ai is None:
+        _worker_ai = MiniMaxAI(PIECES[P1], **engine)
+    ai = _worker_ai
+    rng = random.Random(seed)
+
+    samples = []
+    seen = set() # Skip labelling repeats within this batch
+    for _ in range(games):
+        game = Connect4(rows, cols)
+        while not game.game_over:
+            legal = [col for col in range(cols) if game.get_next_open_row(col) is not None]
+            if game.moves < random_plies:
+                col = rng.choice(legal)
+            else:
+                position = game.to_position()
+                key, _ = position.canonical_mover_key()
+                best, score = ai.search_position(position)
+                if key not in seen:
+                    seen.add(key)
+                    samples.append((key, position.masks[0], position.masks[1],
+                                    game.current_player, score, best))
+                col = rng.choice(legal) if rng.random() < epsilon else best
+
+            _, row = game.drop_piece(col)
+            if game.check_win(row, col) or game.check_draw():
+                game.game_over = True
+            else:
+                game.switch_player()
+    return samples
+
+
+def generate(path, positions, engine=None, workers=None, games_per_task=4, random_plies=4,
+             epsilon=0.1, seed=0, capacity=None, rows=6, cols=7, report=print):
+    """
+    Runs self-play on `workers` processes until `positions` new positions
+    have been stored in the data set at `path`. `engine` holds MiniMaxAI
+    keyword arguments. Games open with `random_plies` random moves and
+    then play a random move instead of the best one with probability
+    `epsilon`, so games do not all repeat. Returns throughput stats.
+    """
+    engine = engine or {'level': 6, 'time_budget_ms': 100}
+    workers = workers or os.cpu_count() or 1
+    writer = TrainingDataWriter(path, capacity or max(positions, 1), rows, cols)
+    target = min(writer.count + positions, writer.capacity)
+    stored_before = writer.count
+    if report and target < writer.count + positions:
+        report(f"{path} has room for only {target - writer.count} more positions")
+
+    start = perf_counter()
+    last_report = start
+    searched = 0
+    tasks = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        running = set()
+        while writer.count < target or running:
+            # Keep every worker busy, with one task queued behind it
+            while writer.count < target and len(running) < 2 * workers:
+                args = (seed * 1000003 + tasks, games_per_task, engine, random_plies, epsilon, rows, cols)
+                running.add(executor.submit(_play_games, args))
+                tasks += 1
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                samples = future.result()
+                searched += len(samples)
+                writer.add(samples, target)
+            if writer.count >= target:
+                for future in running:
+                    future.cancel()
+                running = {future for future in running if not future.cancelled()}
+
+            now = perf_counter()
+            if report and now - last_report > 5:
+                last_report = now
+                report(f"{writer.count - stored_before} positions stored, "
+                       f"{(writer.count - stored_before) / (now - start):.0f}/s")
+    writer.close()
+
+    elapsed = perf_counter() - start
+    stored = writer.count - stored_before
+    return {
+        'stored': stored,
+        'total': writer.count,
+        'searched': searched,
+        'duplicates': writer.duplicates,
+        'seconds': round(elapsed, 2),
+        'positions_per_s': round(stored / elapsed, 1),
+        'positions_per_s_per_core': round(stored / elapsed / workers, 1),
+        'searched_per_s_per_core': round(searched / elapsed / workers, 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate self-play training data")
+    parser.add_argument('path', nargs='?', default='training_data')
+    parser.add_argument('--positions', type=int, default=10000, help="new positions to store")
+    parser.add_argument('--capacity', type=int, default=None,
+                        help="rows to preallocate for a new data set (default: --positions)")
+    parser.add_argument('--engine', default='{"level": 6, "time_budget_ms": 100}',
+                        help="JSON MiniMaxAI kwargs used to label and play")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--random-plies', type=int, default=4)
+    parser.add_argument('--epsilon', type=float, default=0.1)
+    parser.add_argument('--seed', type=int, default=0,
+                        help="change it when adding to an existing data set, or the games repeat")
+    args = parser.parse_args()
+
+    stats = generate(args.path, args.positions, json.loads(args.engine), args.workers,
+                     random_plies=args.random_plies, epsilon=args.epsilon, seed=args.seed,
+                     capacity=args.capacity)
+    print(json.dumps(stats, indent=2))
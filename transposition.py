@@ -0,0 +1,92 @@
+# Bound types stored with every entry
+EXACT = 0
+LOWER = 1   # Real score is >= stored score (search failed high)
+UPPER = 2   # Real score is <= stored score (search failed low)
+
+# Fibonacci hashing constant, spreads bitboard keys (whose low bits only
+# describe the first columns) over all the buckets
+_MIX = 0x9E3779B97F4A7C15
+
+
+class TranspositionTable:
+    """
+    Fixed size transposition table for the minimax search.
+
+    The table is a preallocated list of `buckets` two-slot buckets, so its
+    memory use never grows past 2 * buckets entries:
+      * slot 0 is depth-preferred: only replaced by an equal or deeper
+        search, or by any search once its entry is from an older generation.
+      * slot 1 is always-replace: catches everything slot 0 refused.
+
+    Entries are (key, depth, flag, score, move, generation) tuples.
+    """
+
+    def __init__(self, buckets=1 << 16):
+        self.buckets = buckets
+        self.generation = 0
+        self._slots = [None] * (2 * buckets)
+
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    def __len__(self):
+        return sum(1 for entry in self._slots if entry is not None)
+
+    def new_search(self):
+        """
+        Marks the start of a new root search so the depth-preferred slots can
+        age out entries from earlier moves of the game.
+        """
+        self.generation += 1
+
+    def clear(self):
+        self._slots = [None] * (2 * self.buckets)
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    def _index(self, key):
+        return 2 * (((key * _MIX) >> 40) % self.buckets)
+
+    def probe(self, key):
+        """
+        Returns the stored entry for `key`, or None.
+        """
+        index = self._index(key)
+        slots = self._slots
+
+        entry = slots[index]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        entry = slots[index + 1]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        return None
+
+    def store(self, key, depth, flag, score, move):
+        index = self._index(key)
+        slots = self._slots
+        entry = (key, depth, flag, score, move, self.generation)
+        self.stores += 1
+
+        preferred = slots[index]
+        if preferred is None or preferred[0] == key or depth >= preferred[1] \
+           or preferred[5] != self.generation:
+            slots[index] = entry
+        else:
+            slots[index + 1] = entry
+
+    def stats(self):
+        probes = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'stores': self.stores,
+            'hit_rate': self.hits / probes if probes else 0.0,
+        }